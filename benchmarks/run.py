@@ -0,0 +1,185 @@
+"""Benchmark harness for toelpel.
+
+Generate a synthetic workspace, time the toelpel commands on it and store the
+results as JSON, so that the timings of different versions can be compared:
+
+```
+python -m benchmarks.run --repos 50 --output benchmarks/results
+python -m benchmarks.run --compare old.json new.json
+```
+"""
+
+import json
+import statistics
+import sys
+from datetime import UTC, datetime
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from shutil import rmtree
+from subprocess import DEVNULL, run
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import click
+from loguru import logger
+from rich.console import Console
+from rich.table import Table
+
+from toelpel.colony import Colony
+
+from .workspace import WorkspaceSpec, generate_workspace
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def toelpel(*args):
+    """Run toelpel in a separate process, as a user would."""
+    return run(
+        [sys.executable, "-m", "toelpel.cli", *map(str, args)],
+        stdout=DEVNULL,
+        stderr=DEVNULL,
+        check=True,
+    )
+
+
+def measure(callback, repeat: int, setup=None) -> dict:
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = perf_counter()
+        callback()
+        runs.append(perf_counter() - start)
+    return {"runs": runs, "min": min(runs), "median": statistics.median(runs)}
+
+
+def toelpel_version() -> str:
+    try:
+        package_version = version("toelpel")
+    except PackageNotFoundError:
+        package_version = "unknown"
+    revision = run(
+        ["git", "-C", Path(__file__).parent, "rev-parse", "--short", "HEAD"],
+        encoding="utf-8",
+        capture_output=True,
+    ).stdout.strip()
+    return f"{package_version}+{revision}" if revision else package_version
+
+
+def benchmark(tmp_path: Path, spec: WorkspaceSpec, repeat: int) -> dict:
+    index = generate_workspace(tmp_path, spec)
+    workspace = index.parent
+    clone_target = tmp_path / "clone"
+
+    def fresh_clone_target():
+        rmtree(clone_target, ignore_errors=True)
+        clone_target.mkdir()
+
+    def colony_load():
+        Colony(index, workspace)
+
+    colony = Colony(index, workspace)
+    saved_index = tmp_path / "saved.ttl"
+
+    def colony_save():
+        colony.graph.serialize(saved_index, format="turtle")
+
+    cases = {
+        "scan": lambda: toelpel("scan", workspace, "--index", index),
+        "scan --discover": lambda: toelpel(
+            "scan", "--discover", workspace, "--index", index
+        ),
+        "list": lambda: toelpel("list", workspace, "--index", index),
+        "list --format json": lambda: toelpel(
+            "list", workspace, "--index", index, "--format", "json"
+        ),
+        "Colony load": colony_load,
+        "Colony save": colony_save,
+    }
+    timings = {name: measure(case, repeat) for name, case in cases.items()}
+    timings["clone --all"] = measure(
+        lambda: toelpel("clone", "--all", "--rootdir", clone_target, "--index", index),
+        repeat,
+        setup=fresh_clone_target,
+    )
+    return timings
+
+
+def compare(old_file: Path, new_file: Path):
+    old = json.loads(old_file.read_text())
+    new = json.loads(new_file.read_text())
+
+    table = Table(show_header=True, header_style="bold")
+    table.add_column("Case", ratio=2)
+    table.add_column(old["version"], justify="right")
+    table.add_column(new["version"], justify="right")
+    table.add_column("Change", justify="right")
+    for case, new_timing in new["timings"].items():
+        old_timing = old["timings"].get(case)
+        if not old_timing:
+            table.add_row(case, "", f"{new_timing['median']:.3f}s", "")
+            continue
+        change = new_timing["median"] / old_timing["median"] - 1
+        fg = "red" if change > 0.1 else "green" if change < -0.1 else "default"
+        table.add_row(
+            case,
+            f"{old_timing['median']:.3f}s",
+            f"{new_timing['median']:.3f}s",
+            f"[{fg}]{change:+.1%}[/{fg}]",
+        )
+    Console().print(table)
+
+
+@click.command()
+@click.option("--repos", default=WorkspaceSpec.repos)
+@click.option("--branches", default=WorkspaceSpec.branches)
+@click.option("--stash-ratio", default=WorkspaceSpec.stash_ratio)
+@click.option("--dirty-ratio", default=WorkspaceSpec.dirty_ratio)
+@click.option("--depth", default=WorkspaceSpec.depth)
+@click.option("--noise-dirs", default=WorkspaceSpec.noise_dirs)
+@click.option("--noise-files", default=WorkspaceSpec.noise_files)
+@click.option("--seed", default=WorkspaceSpec.seed)
+@click.option("--repeat", default=3, help="How often each case is measured.")
+@click.option("-o", "--output", default=RESULTS_DIR, type=click.Path(path_type=Path))
+@click.option(
+    "--compare",
+    "compare_files",
+    nargs=2,
+    default=None,
+    type=click.Path(exists=True, path_type=Path),
+    help="Compare two stored results instead of running the benchmark.",
+)
+def main(repeat, output, compare_files, **spec_args):
+    """Benchmark toelpel on a synthetic workspace."""
+    if compare_files:
+        compare(*compare_files)
+        return
+
+    logger.remove()
+    spec = WorkspaceSpec(**spec_args)
+    with TemporaryDirectory(prefix="toelpel-bench-") as tmp_dir:
+        timings = benchmark(Path(tmp_dir), spec, repeat)
+
+    now = datetime.now(UTC)
+    result = {
+        "version": toelpel_version(),
+        "timestamp": now.isoformat(),
+        "spec": spec_args,
+        "timings": timings,
+    }
+    output.mkdir(parents=True, exist_ok=True)
+    result_file = output / f"{result['version']}-{now:%Y%m%dT%H%M%S}.json"
+    result_file.write_text(json.dumps(result, indent=2))
+
+    table = Table(show_header=True, header_style="bold")
+    table.add_column("Case", ratio=2)
+    table.add_column("min", justify="right")
+    table.add_column("median", justify="right")
+    for case, timing in timings.items():
+        table.add_row(case, f"{timing['min']:.3f}s", f"{timing['median']:.3f}s")
+    Console().print(table)
+    print(f"Results stored in {result_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Generate synthetic workspaces to benchmark toelpel on.
+
+A generated workspace consists of a directory with a number of git repositories,
+nested at a configurable depth, each with a local bare repository as its `origin`
+remote. Some of the repositories have stashes or uncommitted changes, and every
+repository carries an ignored directory tree (noise) that a discovery walk has to
+skip.
+"""
+
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from subprocess import DEVNULL, run
+
+from toelpel.colony import INDEX_DEFAULT_NAME, Colony
+from toelpel.git import git
+
+GIT_IDENTITY = ["-c", "user.name=Benchmark", "-c", "user.email=bench@example.org"]
+
+
+@dataclass
+class WorkspaceSpec:
+    """The parameters of a synthetic workspace."""
+
+    repos: int = 20
+    branches: int = 3
+    stash_ratio: float = 0.2
+    dirty_ratio: float = 0.3
+    depth: int = 2
+    noise_dirs: int = 3
+    noise_files: int = 20
+    seed: int = 0
+
+
+def _git(repo_path, *args):
+    cmd = ["git"]
+    if repo_path:
+        cmd += ["-C", str(repo_path)]
+    run([*cmd, *GIT_IDENTITY, *args], stdout=DEVNULL, stderr=DEVNULL, check=True)
+
+
+def _repo_relpath(number: int, depth: int) -> Path:
+    """Spread the repositories over `depth` levels of group directories."""
+    groups = [f"group_{(number >> (2 * level)) % 4}" for level in range(depth - 1)]
+    return Path(*groups, f"repo_{number:04d}")
+
+
+def _add_noise(repo_path: Path, spec: WorkspaceSpec):
+    """Add an ignored directory tree to the repository."""
+    (repo_path / ".gitignore").write_text("/build/\n")
+    for dir_number in range(spec.noise_dirs):
+        noise_dir = repo_path / "build" / f"noise_{dir_number}" / "nested"
+        noise_dir.mkdir(parents=True)
+        for file_number in range(spec.noise_files):
+            (noise_dir / f"file_{file_number}.o").write_bytes(b"\0" * 64)
+
+
+def _init_repo(repo_path: Path, remote_path: Path, spec: WorkspaceSpec, rng):
+    _git(None, "init", "--bare", "--initial-branch=main", str(remote_path))
+    _git(None, "init", "--initial-branch=main", str(repo_path))
+    _add_noise(repo_path, spec)
+    (repo_path / "README.md").write_text(f"# {repo_path.name}\n")
+    _git(repo_path, "add", ".")
+    _git(repo_path, "commit", "-m", "init")
+    _git(repo_path, "remote", "add", "origin", str(remote_path))
+    _git(repo_path, "push", "-u", "origin", "main")
+    for branch_number in range(1, spec.branches):
+        branch = f"branch_{branch_number}"
+        _git(repo_path, "checkout", "-b", branch)
+        (repo_path / f"{branch}.txt").write_text(branch)
+        _git(repo_path, "add", ".")
+        _git(repo_path, "commit", "-m", branch)
+        # leave every other branch unpushed, so some repos are ahead
+        if branch_number % 2:
+            _git(repo_path, "push", "-u", "origin", branch)
+    _git(repo_path, "checkout", "main")
+    if rng.random() < spec.stash_ratio:
+        (repo_path / "README.md").write_text("stashed change\n")
+        _git(repo_path, "stash")
+    if rng.random() < spec.dirty_ratio:
+        (repo_path / "README.md").write_text("dirty change\n")
+        (repo_path / "untracked.txt").write_text("untracked\n")
+
+
+def generate_workspace(target: Path, spec: WorkspaceSpec) -> Path:
+    """Generate a workspace below `target` and return the path to its index.
+
+    The workspace is created in `target / "workspace"`, the bare remotes in
+    `target / "remotes"`.
+    """
+    rng = random.Random(spec.seed)
+    workspace = target / "workspace"
+    remotes = target / "remotes"
+    workspace.mkdir(parents=True)
+    remotes.mkdir(parents=True)
+
+    repos = []
+    for number in range(spec.repos):
+        relpath = _repo_relpath(number, spec.depth)
+        repo_path = workspace / relpath
+        remote_path = remotes / f"{relpath.name}.git"
+        _init_repo(repo_path, remote_path, spec, rng)
+        repos.append(git(repo_path, workspace))
+
+    index = workspace / INDEX_DEFAULT_NAME
+    Colony(index, workspace).update_from_list(repos)
+    return index
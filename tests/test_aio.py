@@ -0,0 +1,59 @@
+import asyncio
+import os
+from pathlib import Path
+from shutil import copyfile
+from subprocess import DEVNULL, run
+
+from toelpel.aio import AsyncColony
+from toelpel.colony import Colony
+
+test_path = Path(os.path.dirname(__file__))
+examples_path = test_path / "assets" / "examples"
+
+
+def init_workspace(tmp_path):
+    index = tmp_path / "workspace.ttl"
+    copyfile(examples_path / "index_remote_ab.ttl", index)
+    run(["git", "init", tmp_path / "repo_a"], stdout=DEVNULL)
+    run(["git", "init", tmp_path / "repo_b"], stdout=DEVNULL)
+    (tmp_path / "repo_b" / "README.md").write_text("dirty")
+    return index
+
+
+def test_statuses_match_sync(tmp_path):
+    index = init_workspace(tmp_path)
+
+    async def collect():
+        colony = await AsyncColony.load(index, tmp_path, jobs=2)
+        return [status async for status in colony.statuses()]
+
+    statuses = asyncio.run(collect())
+
+    expected = [repo.status() for repo in Colony(index, tmp_path).to_list()]
+    key = lambda status: status["repo"]  # noqa: E731
+    assert sorted(statuses, key=key) == sorted(expected, key=key)
+
+
+def test_statuses_cancelled(tmp_path):
+    index = init_workspace(tmp_path)
+
+    async def first():
+        colony = await AsyncColony.load(index, tmp_path, jobs=1)
+        statuses = colony.statuses()
+        status = await anext(statuses)
+        await statuses.aclose()
+        return status
+
+    status = asyncio.run(first())
+
+    assert status["repo"] in ["repo_a", "repo_b"]
+
+
+def test_iterate_colony(tmp_path):
+    index = init_workspace(tmp_path)
+
+    async def repos():
+        colony = AsyncColony(Colony(index, tmp_path))
+        return [str(repo) async for repo in colony]
+
+    assert sorted(asyncio.run(repos())) == ["repo_a", "repo_b"]
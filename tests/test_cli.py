@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from shutil import copyfile, copytree
@@ -10,6 +11,10 @@ from query_collection import TemplateQueryCollection
 from rdflib import Graph, URIRef
 
 from toelpel.cli import cli
+from toelpel.colony import Colony
+from toelpel.git import git as git_repo
+from toelpel.history import History, history_path
+from toelpel.profile import profiler
 
 test_path = Path(os.path.dirname(__file__))
 examples_path = test_path / "assets" / "examples"
@@ -246,3 +251,650 @@ def test_clone_fixture(tmp_path, git_repo):
     assert (workspace / "space" / "simpsons").is_dir()
     assert (workspace / "space" / "simpsons" / ".git").is_dir()
     assert (workspace / "space" / "simpsons" / "README.md").is_file()
+
+
+def test_list_profile(tmp_path):
+    """Test that the list command records a profile and writes a chrome trace."""
+    # prepare paths
+    repo_a_path = tmp_path / "repo_a"
+    repo_b_path = tmp_path / "repo_b"
+    index = tmp_path / "workspace.ttl"
+    trace = tmp_path / "trace.json"
+
+    # init workspace, with an index
+    copyfile(examples_path / "index_remote_ab.ttl", index)
+    init_repo_with_dir(repo_a_path, examples_path / "repo_content")
+    init_repo_with_dir(repo_b_path, examples_path / "repo_content")
+
+    # execute list command
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--profile",
+            "--profile-output",
+            str(trace),
+            "--profile-format",
+            "chrome",
+            "list",
+            str(tmp_path),
+            "--index",
+            str(index),
+        ],
+    )
+    logger.debug(result.stdout)
+    assert result.exit_code == 0
+
+    # verify the results
+    events = json.loads(trace.read_text())["traceEvents"]
+    names = {event["name"] for event in events}
+    assert "index load" in names
+    assert "render" in names
+    assert "git status" in names
+    assert "Git processes" in result.stderr
+
+    # the profiler does not keep recording after the invocation
+    assert not profiler.enabled
+    recorded = len(profiler.processes)
+    runner.invoke(cli, ["list", str(tmp_path), "--index", str(index)])
+    assert len(profiler.processes) == recorded
+
+
+def test_exec(tmp_path):
+    """Test that the exec command runs a command in all repositories and aggregates
+    the exit codes."""
+    # prepare paths
+    repo_a_path = tmp_path / "repo_a"
+    repo_b_path = tmp_path / "repo_b"
+    index = tmp_path / "workspace.ttl"
+
+    # init workspace, with an index
+    copyfile(examples_path / "index_remote_ab.ttl", index)
+    init_repo_with_dir(repo_a_path, examples_path / "repo_content")
+    init_repo_with_dir(repo_b_path, examples_path / "repo_content")
+    (repo_b_path / "marker").touch()
+
+    # execute exec command
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["exec", str(tmp_path), "--index", str(index), "--", "ls", "README.md"]
+    )
+    logger.debug(result.stdout)
+    assert result.exit_code == 0
+    assert "── repo_a (exit 0)" in result.stdout
+    assert "── repo_b (exit 0)" in result.stdout
+
+    result = runner.invoke(
+        cli,
+        [
+            "exec",
+            "--prefix",
+            "--index",
+            str(index),
+            str(tmp_path),
+            "--",
+            "ls",
+            "marker",
+        ],
+    )
+    logger.debug(result.stdout)
+    assert result.exit_code == 1
+    assert "repo_b: marker" in result.stdout
+    assert "repo_a: exit" in result.stderr
+
+    result = runner.invoke(
+        cli, ["exec", "--dirty", "--index", str(index), str(tmp_path), "--", "ls"]
+    )
+    assert result.exit_code == 0
+    assert "repo_b" in result.stdout
+    assert "repo_a" not in result.stdout
+
+    result = runner.invoke(
+        cli, ["exec", "--index", str(index), str(tmp_path), "--", "toelpel-no-such-cmd"]
+    )
+    assert result.exit_code == 1
+    assert "repo_a: exit 127" in result.stderr
+    assert "repo_b: exit 127" in result.stderr
+
+
+def test_grep(tmp_path):
+    """Test that the grep command finds matches in all repositories and stops at the
+    limit."""
+    # prepare paths
+    repo_a_path = tmp_path / "repo_a"
+    repo_b_path = tmp_path / "repo_b"
+    index = tmp_path / "workspace.ttl"
+
+    # init workspace, with an index
+    copyfile(examples_path / "index_remote_ab.ttl", index)
+    init_repo_with_dir(repo_a_path, examples_path / "repo_content")
+    init_repo_with_dir(repo_b_path, examples_path / "repo_content")
+
+    # execute grep command
+    runner = CliRunner()
+    result = runner.invoke(cli, ["grep", "test asset", str(tmp_path), "-i", str(index)])
+    logger.debug(result.stdout)
+    assert result.exit_code == 0
+    assert "repo_a/README.md:3:This is a test asset." in result.stdout
+    assert "repo_b/README.md:3:This is a test asset." in result.stdout
+
+    result = runner.invoke(
+        cli,
+        ["grep", "TEST", str(tmp_path), "-i", str(index), "--ignore-case", "-n", "1"],
+    )
+    assert result.exit_code == 0
+    assert len(result.stdout.splitlines()) == 1
+
+    result = runner.invoke(
+        cli, ["grep", "no such text", str(tmp_path), "-i", str(index)]
+    )
+    assert result.exit_code == 1
+    assert result.stdout == ""
+
+    result = runner.invoke(cli, ["grep", "a[", str(tmp_path), "-i", str(index)])
+    assert result.exit_code == 2
+    assert "repo_a: fatal:" in result.stderr
+
+
+def test_maintain(tmp_path):
+    """Test that the maintain command writes commit-graphs and enables the untracked
+    cache."""
+    # prepare paths
+    repo_a_path = tmp_path / "repo_a"
+    repo_b_path = tmp_path / "repo_b"
+    index = tmp_path / "workspace.ttl"
+
+    # init workspace, with an index
+    copyfile(examples_path / "index_remote_ab.ttl", index)
+    init_repo_with_dir(repo_a_path, examples_path / "repo_content")
+    init_repo_with_dir(repo_b_path, examples_path / "repo_content")
+
+    # execute maintain command
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["maintain", str(tmp_path), "--index", str(index), "--nice", "0"]
+    )
+    logger.debug(result.stdout)
+    assert result.exit_code == 0
+    assert "repo_a" in result.stdout
+    assert "repo_b" in result.stdout
+
+    # verify the results
+    for repo_path in [repo_a_path, repo_b_path]:
+        objects_info = repo_path / ".git" / "objects" / "info"
+        assert any(objects_info.glob("commit-graph*"))
+        config = run(
+            ["git", "-C", repo_path, "config", "--get", "core.untrackedCache"],
+            capture_output=True,
+            encoding="utf-8",
+        )
+        assert config.stdout.strip() == "true"
+
+
+def test_list_federated(tmp_path):
+    """Test that the list command lists the repositories of all workspaces in the
+    configuration."""
+    # prepare paths
+    work = tmp_path / "work"
+    oss = tmp_path / "oss"
+    config = tmp_path / "config.yaml"
+
+    # init workspaces, with an index each
+    for workspace in [work, oss]:
+        workspace.mkdir()
+        copyfile(examples_path / "index_remote_ab.ttl", workspace / "workspaces.ttl")
+        init_repo_with_dir(workspace / "repo_a", examples_path / "repo_content")
+        init_repo_with_dir(workspace / "repo_b", examples_path / "repo_content")
+    config.write_text(
+        dedent(f"""
+        workspaces:
+          work: {work / "workspaces.ttl"}
+          oss:
+            index: {oss / "workspaces.ttl"}
+            rootdir: {oss}
+        """)
+    )
+
+    # execute list command
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["--config", str(config), "list", "--federated", "--format", "jsonl"]
+    )
+    logger.debug(result.stdout)
+    assert result.exit_code == 0
+
+    # verify the results
+    statuses = [json.loads(line) for line in result.stdout.splitlines()]
+    assert sorted((status["workspace"], status["repo"]) for status in statuses) == [
+        ("oss", "repo_a"),
+        ("oss", "repo_b"),
+        ("work", "repo_a"),
+        ("work", "repo_b"),
+    ]
+
+    result = runner.invoke(cli, ["--config", str(config), "list", "--federated"])
+    assert result.exit_code == 0
+    assert "Workspace" in result.stdout
+    assert "oss" in result.stdout
+
+    result = runner.invoke(cli, ["--config", str(config), "fetch", "--federated"])
+    assert result.exit_code == 0
+
+    missing = tmp_path / "missing.yaml"
+    result = runner.invoke(cli, ["--config", str(missing), "list", "--federated"])
+    assert result.exit_code == 2
+    assert f"No workspaces are configured in {missing}" in result.output
+
+
+def test_bundle_and_clone_from_bundles(tmp_path):
+    """Test that incremental bundles of a workspace can be restored with clone."""
+    # prepare paths
+    remote_path = tmp_path / "remotes" / "simpsons"
+    workspace = tmp_path / "workspace"
+    repo_path = workspace / "space" / "simpsons"
+    index = workspace / "workspaces.ttl"
+    bundle_dir = tmp_path / "bundles"
+    restored = tmp_path / "restored"
+
+    # init workspace with a repository that has a remote
+    init_repo_with_dir(remote_path, examples_path / "repo_content")
+    git(None, "clone", remote_path, repo_path)
+    copyfile(examples_path / "index_local.ttl", index)
+
+    # bundle twice, with a new commit in between
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["bundle", str(bundle_dir), str(workspace), "--index", str(index)]
+    )
+    assert result.exit_code == 0
+    (repo_path / "new.txt").write_text("new")
+    git(repo_path, "add", "new.txt")
+    git(repo_path, "commit", "-m", "new")
+    result = runner.invoke(
+        cli, ["bundle", str(bundle_dir), str(workspace), "--index", str(index)]
+    )
+    assert result.exit_code == 0
+    manifest = json.loads((bundle_dir / "manifest.json").read_text())
+    assert manifest["repos"]["space/simpsons"]["bundles"] == [
+        "space/simpsons/0000.bundle",
+        "space/simpsons/0001.bundle",
+    ]
+
+    # restore from the bundles
+    restored.mkdir()
+    result = runner.invoke(
+        cli,
+        [
+            "clone",
+            "--all",
+            "--index",
+            str(bundle_dir / "workspaces.ttl"),
+            "--rootdir",
+            str(restored),
+            "--from-bundles",
+            str(bundle_dir),
+        ],
+    )
+    logger.debug(result.stdout)
+    assert result.exit_code == 0
+
+    # verify the results
+    restored_repo = restored / "space" / "simpsons"
+    assert (restored_repo / "README.md").is_file()
+    assert (restored_repo / "new.txt").is_file()
+    upstream = run(
+        ["git", "-C", restored_repo, "rev-parse", "--abbrev-ref", "@{upstream}"],
+        capture_output=True,
+        encoding="utf-8",
+    )
+    assert upstream.stdout.strip().startswith("origin/")
+
+    # a corrupt bundle fails the restore without aborting the command
+    (bundle_dir / "space" / "simpsons" / "0001.bundle").write_text("corrupt")
+    (tmp_path / "corrupt").mkdir()
+    result = runner.invoke(
+        cli,
+        [
+            "clone",
+            "--all",
+            "--index",
+            str(bundle_dir / "workspaces.ttl"),
+            "--rootdir",
+            str(tmp_path / "corrupt"),
+            "--from-bundles",
+            str(bundle_dir),
+        ],
+    )
+    assert result.exit_code == 1
+    assert isinstance(result.exception, SystemExit)
+    assert "Restoring space/simpsons failed" in result.stderr
+
+
+def test_bundle_failure(tmp_path):
+    """Test that the bundle command reports the repositories that failed and exits
+    with 1."""
+    # prepare paths
+    repo_a_path = tmp_path / "repo_a"
+    repo_b_path = tmp_path / "repo_b"
+    index = tmp_path / "workspace.ttl"
+    bundle_dir = tmp_path / "bundles"
+
+    # init workspace, with a corrupt object store in repo_b
+    copyfile(examples_path / "index_remote_ab.ttl", index)
+    init_repo_with_dir(repo_a_path, examples_path / "repo_content")
+    init_repo_with_dir(repo_b_path, examples_path / "repo_content")
+    for objects_dir in (repo_b_path / ".git" / "objects").glob("??"):
+        for object_file in objects_dir.iterdir():
+            object_file.unlink()
+
+    # execute bundle command
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["bundle", str(bundle_dir), str(tmp_path), "--index", str(index)]
+    )
+
+    # verify the results
+    assert result.exit_code == 1
+    assert "Bundling repo_b failed" in result.stderr
+    manifest = json.loads((bundle_dir / "manifest.json").read_text())
+    assert list(manifest["repos"]) == ["repo_a"]
+
+
+def test_update(tmp_path):
+    """Test that the update command fast-forwards clean repositories and skips dirty
+    and diverged ones."""
+    # prepare paths
+    remote_path = tmp_path / "remotes" / "simpsons"
+    workspace = tmp_path / "workspace"
+    index = workspace / "workspaces.ttl"
+
+    # init workspace with three clones of one remote
+    init_repo_with_dir(remote_path, examples_path / "repo_content")
+    workspace.mkdir()
+    index.write_text(
+        "@prefix toel: <https://toelpel/> .\n"
+        + "".join(
+            f"<path:{name}> a toel:repo .\n" for name in ["clean", "dirty", "div"]
+        )
+    )
+    for name in ["clean", "dirty", "div"]:
+        git(None, "clone", remote_path, workspace / name)
+    (workspace / "dirty" / "README.md").write_text("dirty")
+    (workspace / "div" / "local.txt").write_text("local")
+    git(workspace / "div", "add", "local.txt")
+    git(workspace / "div", "commit", "-m", "local")
+
+    # add a commit to the remote and fetch it
+    (remote_path / "new.txt").write_text("new")
+    git(remote_path, "add", "new.txt")
+    git(remote_path, "commit", "-m", "new")
+    for name in ["clean", "dirty", "div"]:
+        git(workspace / name, "fetch")
+
+    # execute update command
+    runner = CliRunner()
+    result = runner.invoke(cli, ["update", str(workspace), "--index", str(index)])
+    logger.debug(result.stdout)
+    assert result.exit_code == 0
+
+    # verify the results
+    assert (workspace / "clean" / "new.txt").is_file()
+    assert not (workspace / "dirty" / "new.txt").exists()
+    assert not (workspace / "div" / "new.txt").exists()
+    assert "diverged" in result.stdout
+    assert "dirty" in result.stdout
+
+
+def test_audit(tmp_path):
+    """Test that the audit command lists only the repositories with unpushed work."""
+    # prepare paths
+    remote_path = tmp_path / "remotes" / "simpsons"
+    workspace = tmp_path / "workspace"
+    index = workspace / "workspaces.ttl"
+
+    # init workspace with clones of one remote and a repository without remote
+    init_repo_with_dir(remote_path, examples_path / "repo_content")
+    workspace.mkdir()
+    names = ["clean", "ahead", "untracked", "stashed", "detached", "tagged", "local"]
+    index.write_text(
+        "@prefix toel: <https://toelpel/> .\n"
+        + "".join(f"<path:{name}> a toel:repo .\n" for name in names)
+    )
+    for name in names[:-1]:
+        git(None, "clone", remote_path, workspace / name)
+    init_repo_with_dir(workspace / "local", examples_path / "repo_content")
+    (workspace / "ahead" / "local.txt").write_text("local")
+    git(workspace / "ahead", "add", "local.txt")
+    git(workspace / "ahead", "commit", "-m", "local")
+    (workspace / "untracked" / "new.txt").write_text("new")
+    (workspace / "stashed" / "README.md").write_text("stashed")
+    git(workspace / "stashed", "stash")
+    for name in ["detached", "tagged"]:
+        git(workspace / name, "checkout", "--detach")
+        git(workspace / name, "commit", "--allow-empty", "-m", "detached")
+    git(workspace / "tagged", "tag", "v1")
+    git(workspace / "tagged", "checkout", "-")
+
+    # execute audit command
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["audit", str(workspace), "--index", str(index), "--format", "json"]
+    )
+    logger.debug(result.stdout)
+    assert result.exit_code == 0
+
+    # verify the results
+    audit = {entry["repo"]: entry for entry in json.loads(result.stdout)}
+    assert set(audit) == {
+        "ahead",
+        "untracked",
+        "stashed",
+        "detached",
+        "tagged",
+        "local",
+    }
+    assert audit["ahead"]["commits"] == 1
+    assert audit["ahead"]["size"] > 0
+    assert list(audit["ahead"]["branches"].values())[0]["upstream"]
+    assert audit["untracked"]["untracked"] == 1
+    assert audit["stashed"]["stashes"] == 1
+    assert audit["stashed"]["commits"] == 0
+    assert audit["detached"]["branches"]["HEAD"]["commits"] == 1
+    assert audit["tagged"]["branches"] == {"tags/v1": {"commits": 1, "upstream": None}}
+    assert audit["local"]["commits"] >= 1
+    assert list(audit["local"]["branches"].values())[0]["upstream"] is None
+
+
+def test_list_changed_since(tmp_path):
+    """Test that list --changed-since only lists the repositories that changed since
+    the last check."""
+    # prepare paths
+    repo_a_path = tmp_path / "repo_a"
+    repo_b_path = tmp_path / "repo_b"
+    index = tmp_path / "workspace.ttl"
+
+    # init workspace, with an index
+    copyfile(examples_path / "index_remote_ab.ttl", index)
+    init_repo_with_dir(repo_a_path, examples_path / "repo_content")
+    init_repo_with_dir(repo_b_path, examples_path / "repo_content")
+
+    # execute list command three times, with a change before the last one
+    runner = CliRunner()
+    args = ["list", str(tmp_path), "--index", str(index), "--format", "jsonl"]
+    first = runner.invoke(cli, [*args, "--changed-since", "last"])
+    second = runner.invoke(cli, [*args, "--changed-since", "last"])
+    (repo_b_path / "new.txt").write_text("new")
+    git(repo_b_path, "add", "new.txt")
+    third = runner.invoke(cli, [*args, "--changed-since", "last"])
+    logger.debug(third.stdout)
+    assert first.exit_code == second.exit_code == third.exit_code == 0
+
+    # verify the results
+    def changed(result):
+        return [json.loads(line)["repo"] for line in result.stdout.splitlines()]
+
+    assert changed(first) == ["repo_a", "repo_b"]
+    assert changed(second) == []
+    assert changed(third) == ["repo_b"]
+    assert (tmp_path / "workspace.history.jsonl").is_file()
+
+
+def test_list_changed_since_worktree_and_scope(tmp_path):
+    """Test that list --changed-since detects edits of tracked files and that a
+    check of a subtree does not hide the changes of other repositories."""
+    # prepare paths
+    repo_a_path = tmp_path / "repo_a"
+    repo_b_path = tmp_path / "repo_b"
+    index = tmp_path / "workspace.ttl"
+
+    # init workspace, with an index
+    copyfile(examples_path / "index_remote_ab.ttl", index)
+    init_repo_with_dir(repo_a_path, examples_path / "repo_content")
+    init_repo_with_dir(repo_b_path, examples_path / "repo_content")
+
+    runner = CliRunner()
+
+    def list_changed(working_dir):
+        result = runner.invoke(
+            cli,
+            ["list", str(working_dir), "--index", str(index), "--format", "jsonl"]
+            + ["--changed-since", "last"],
+        )
+        assert result.exit_code == 0
+        return [json.loads(line)["repo"] for line in result.stdout.splitlines()]
+
+    assert list_changed(tmp_path) == ["repo_a", "repo_b"]
+
+    # edit a tracked file in place
+    with open(repo_a_path / "README.md", "a") as readme:
+        readme.write("edit")
+    assert list_changed(tmp_path) == ["repo_a"]
+
+    # a change of repo_b is recorded, e.g. by the daemon, before repo_a is listed
+    (repo_b_path / "README.md").write_text("edit")
+    History(history_path(index)).probe(git_repo(repo_b_path, tmp_path))
+    assert list_changed(repo_a_path) == []
+    assert list_changed(tmp_path) == ["repo_b"]
+
+
+def test_du(tmp_path):
+    """Test that the du command measures the repositories and caches the results."""
+    # prepare paths
+    repo_a_path = tmp_path / "repo_a"
+    repo_b_path = tmp_path / "repo_b"
+    index = tmp_path / "workspace.ttl"
+
+    # init workspace, with an index
+    copyfile(examples_path / "index_remote_ab.ttl", index)
+    init_repo_with_dir(repo_a_path, examples_path / "repo_content")
+    init_repo_with_dir(repo_b_path, examples_path / "repo_content")
+    (repo_b_path / "large.txt").write_text("x" * 100000)
+
+    # execute du command twice
+    runner = CliRunner()
+    args = ["du", str(tmp_path), "--index", str(index), "--format", "jsonl"]
+    first = runner.invoke(cli, args)
+    logger.debug(first.stdout)
+    assert first.exit_code == 0
+    assert (tmp_path / "workspace.du.json").is_file()
+    second = runner.invoke(cli, args)
+
+    # verify the results
+    usage = {
+        result["repo"]: result for result in map(json.loads, first.stdout.splitlines())
+    }
+    assert set(usage) == {"repo_a", "repo_b"}
+    assert usage["repo_a"]["objects"] > 0
+    assert usage["repo_b"]["worktree"] >= usage["repo_a"]["worktree"] + 100000
+    assert usage["repo_a"]["gc"] == []
+    assert sorted(second.stdout.splitlines()) == sorted(first.stdout.splitlines())
+
+    # growing an ignored directory is measured, although the cache is used
+    (repo_a_path / ".gitignore").write_text("build/\n")
+    (repo_a_path / "build").mkdir()
+    (repo_a_path / "build" / "output.bin").write_bytes(b"x" * 50000)
+    third = runner.invoke(cli, args)
+    usage_after = {
+        result["repo"]: result for result in map(json.loads, third.stdout.splitlines())
+    }
+    assert usage_after["repo_a"]["worktree"] >= usage["repo_a"]["worktree"] + 50000
+    assert usage_after["repo_a"]["objects"] == usage["repo_a"]["objects"]
+
+    # the table is sorted by size
+    result = runner.invoke(cli, ["du", str(tmp_path), "--index", str(index)])
+    assert result.exit_code == 0
+    assert result.stdout.index("repo_b") < result.stdout.index("repo_a")
+
+
+def test_clone_sharded(tmp_path):
+    """Test that cloning a sharded index to another root directory also clones the
+    repositories of the shards."""
+    # prepare paths
+    remote_path = tmp_path / "remotes" / "simpsons"
+    workspace = tmp_path / "workspace"
+    index = workspace / "workspaces.ttl"
+    target = tmp_path / "target"
+
+    # init an index with a shard, all repositories have the same remote
+    init_repo_with_dir(remote_path, examples_path / "repo_content")
+    workspace.mkdir()
+    target.mkdir()
+    index.write_text(
+        "@prefix toel: <https://toelpel/> .\n"
+        + "".join(
+            f"<path:{name}> a toel:repo ; toel:remote <path:{name}#remote:origin> .\n"
+            f"<path:{name}#remote:origin> toel:fetch <file://{remote_path}> .\n"
+            for name in ["team-a/one", "team-a/two", "three"]
+        )
+    )
+    Colony(index, workspace).add_shard(workspace / "team-a")
+
+    # execute clone command
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["clone", "--all", "--index", str(index), "--rootdir", str(target)]
+    )
+    logger.debug(result.stdout)
+    assert result.exit_code == 0
+
+    # verify the results
+    for name in ["team-a/one", "team-a/two", "three"]:
+        assert (target / name / "README.md").is_file()
+    assert (target / "team-a" / "workspaces.ttl").is_file()
+
+
+def test_list_changed_since_push(tmp_path):
+    """Test that list --changed-since detects a push, which only updates a remote
+    tracking ref."""
+    # prepare paths
+    remote_path = tmp_path / "remotes" / "simpsons"
+    workspace = tmp_path / "workspace"
+    repo_path = workspace / "simpsons"
+    index = workspace / "workspaces.ttl"
+
+    # init workspace with a clone, that is ahead of its remote
+    init_repo_with_dir(remote_path, examples_path / "repo_content")
+    git(remote_path, "config", "receive.denyCurrentBranch", "updateInstead")
+    workspace.mkdir()
+    index.write_text(
+        "@prefix toel: <https://toelpel/> .\n<path:simpsons> a toel:repo .\n"
+    )
+    git(None, "clone", remote_path, repo_path)
+    git(repo_path, "commit", "--allow-empty", "-m", "local")
+
+    runner = CliRunner()
+    args = ["list", str(workspace), "--index", str(index), "--format", "jsonl"]
+
+    def ahead():
+        result = runner.invoke(cli, [*args, "--changed-since", "last"])
+        assert result.exit_code == 0
+        return [
+            branch["ahead"]
+            for line in result.stdout.splitlines()
+            for branch in json.loads(line)["branches"].values()
+        ]
+
+    assert ahead() == [1]
+    git(repo_path, "push")
+    assert ahead() == [0]
+    assert ahead() == []
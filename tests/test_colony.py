@@ -1,8 +1,10 @@
 import os
 from pathlib import Path
 from shutil import copyfile
+from subprocess import DEVNULL, run
 
-from toelpel.colony import Colony, find_index
+from toelpel.colony import Colony, find_index, reconcile
+from toelpel.git import git
 
 test_path = Path(os.path.dirname(__file__))
 examples_path = test_path / "assets" / "examples"
@@ -30,3 +32,90 @@ def test_colony(tmp_path):
     ws = Colony(index=p, base=tmp_path)
     lst = ws.to_list()
     assert len(list(lst)) == 1
+
+
+def write_index(index, repos):
+    index.write_text(
+        "@prefix toel: <https://toelpel/> .\n"
+        + "".join(f"<path:{repo}> a toel:repo .\n" for repo in repos)
+    )
+
+
+def test_colony_add_shard(tmp_path):
+    p = tmp_path / "workspaces.ttl"
+    write_index(p, ["team-a/one", "team-a/two", "team-b/three", "four"])
+    ws = Colony(index=p, base=tmp_path)
+
+    shard = ws.add_shard(tmp_path / "team-a")
+
+    assert shard.index == tmp_path / "team-a" / "workspaces.ttl"
+    assert shard.index.is_file()
+    assert {str(repo) for repo in shard.to_list()} == {"one", "two"}
+
+    ws = Colony(index=p, base=tmp_path)
+    assert {str(repo) for repo in ws.to_list()} == {
+        "team-a/one",
+        "team-a/two",
+        "team-b/three",
+        "four",
+    }
+
+
+def test_colony_shards_loaded_lazily(tmp_path):
+    p = tmp_path / "workspaces.ttl"
+    write_index(p, ["team-a/one", "team-b/two"])
+    Colony(index=p, base=tmp_path).add_shard(tmp_path / "team-a")
+    Colony(index=p, base=tmp_path).add_shard(tmp_path / "team-b")
+
+    ws = Colony(index=p, base=tmp_path)
+    lst = list(ws.to_list(working_dir=tmp_path / "team-b"))
+
+    assert [str(repo) for repo in lst] == ["team-b/two"]
+    assert list(ws._shards) == [Path("team-b")]
+
+
+def test_colony_update_writes_changed_shard(tmp_path):
+    p = tmp_path / "workspaces.ttl"
+    write_index(p, ["team-a/one", "team-b/two"])
+    Colony(index=p, base=tmp_path).add_shard(tmp_path / "team-a")
+    root_mtime = p.stat().st_mtime_ns
+
+    ws = Colony(index=p, base=tmp_path)
+    ws.update_from_list([git(tmp_path / "team-a" / "three", tmp_path)])
+
+    assert p.stat().st_mtime_ns == root_mtime
+    shard = Colony(
+        index=tmp_path / "team-a" / "workspaces.ttl", base=tmp_path / "team-a"
+    )
+    assert {str(repo) for repo in shard.to_list()} == {"one", "three"}
+
+
+def test_reconcile(tmp_path):
+    p = tmp_path / "workspaces.ttl"
+    write_index(p, ["repo_a", "repo_b", "repo_c"])
+    run(["git", "init", tmp_path / "repo_a"], stdout=DEVNULL)
+    (tmp_path / "repo_b").mkdir()
+    run(["git", "init", tmp_path / "group" / "repo_d"], stdout=DEVNULL)
+    (tmp_path / "group" / "plain").mkdir()
+
+    result = reconcile(Colony(index=p, base=tmp_path))
+
+    assert result == {
+        "missing": ["repo_c"],
+        "broken": ["repo_b"],
+        "extra": ["group/repo_d"],
+    }
+
+
+def test_reconcile_outside_base(tmp_path):
+    """A working directory outside the base compares the whole base."""
+    workspace = tmp_path / "workspace"
+    p = workspace / "workspaces.ttl"
+    workspace.mkdir()
+    write_index(p, ["repo_a"])
+    run(["git", "init", workspace / "repo_b"], stdout=DEVNULL)
+    run(["git", "init", tmp_path / "elsewhere" / "repo_c"], stdout=DEVNULL)
+
+    result = reconcile(Colony(index=p, base=workspace), tmp_path / "elsewhere")
+
+    assert result == {"missing": ["repo_a"], "broken": [], "extra": ["repo_b"]}
@@ -0,0 +1,159 @@
+import json
+import os
+import socket
+from pathlib import Path
+from shutil import copyfile
+from subprocess import DEVNULL, run
+from time import time
+from urllib.request import urlopen
+
+from toelpel.colony import Colony
+from toelpel.daemon import Daemon
+from toelpel.git import git as git_repo
+from toelpel.history import History
+
+test_path = Path(os.path.dirname(__file__))
+examples_path = test_path / "assets" / "examples"
+
+
+def init_workspace(tmp_path):
+    index = tmp_path / "workspace.ttl"
+    copyfile(examples_path / "index_remote_ab.ttl", index)
+    run(["git", "init", tmp_path / "repo_a"], stdout=DEVNULL)
+    run(["git", "init", tmp_path / "repo_b"], stdout=DEVNULL)
+    (tmp_path / "repo_b" / "README.md").write_text("dirty")
+    return Colony(index, tmp_path)
+
+
+def probe_all(daemon):
+    daemon.schedule()
+    while not daemon.queue.empty():
+        daemon.probe(daemon.queue.get())
+
+
+def test_probe_cache(tmp_path):
+    daemon = Daemon(init_workspace(tmp_path))
+
+    probe_all(daemon)
+    probe_all(daemon)
+    daemon.update_metrics()
+
+    metrics = daemon.metrics.expose()
+    assert "toelpel_probes_total 2" in metrics
+    assert 'toelpel_cache_lookups_total{result="hit"} 2' in metrics
+    assert "toelpel_cache_hit_ratio 0.5" in metrics
+    assert "toelpel_watchers 2" in metrics
+    assert f'toelpel_repos{{state="dirty",workspace="{tmp_path}"}} 1' in metrics
+    assert "toelpel_probe_duration_seconds_count 2" in metrics
+
+
+def test_probe_cache_worktree(tmp_path):
+    """Test that edits of tracked files are detected, although the fingerprint of
+    the repository does not change."""
+    daemon = Daemon(init_workspace(tmp_path))
+    repo_a = tmp_path / "repo_a"
+    (repo_a / "README.md").write_text("clean")
+    # an old modification time, so that git does not rewrite the index on each probe
+    os.utime(repo_a / "README.md", (time() - 10, time() - 10))
+    run(["git", "-C", repo_a, "add", "README.md"], stdout=DEVNULL)
+    run(
+        ["git", "-C", repo_a, "-c", "user.name=a", "-c", "user.email=a@b", "commit"]
+        + ["-m", "init"],
+        stdout=DEVNULL,
+    )
+
+    probe_all(daemon)
+    probe_all(daemon)
+    with open(repo_a / "README.md", "a") as readme:
+        readme.write("edit")
+    probe_all(daemon)
+    daemon.update_metrics()
+
+    metrics = daemon.metrics.expose()
+    assert 'toelpel_cache_lookups_total{result="hit"} 4' in metrics
+    assert f'toelpel_repos{{state="dirty",workspace="{tmp_path}"}} 2' in metrics
+
+
+def test_probe_cache_push(tmp_path):
+    """Test that a push, which only updates a remote tracking ref, is detected."""
+    daemon = Daemon(init_workspace(tmp_path))
+    repo_a = tmp_path / "repo_a"
+    remote = tmp_path / "remote.git"
+
+    def git(*args):
+        run(
+            ["git", "-C", repo_a, "-c", "user.name=a", "-c", "user.email=a@b", *args],
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+        )
+
+    git("commit", "--allow-empty", "-m", "init")
+    run(["git", "init", "--bare", remote], stdout=DEVNULL)
+    git("remote", "add", "origin", str(remote))
+    git("push", "--set-upstream", "origin", "HEAD")
+    git("commit", "--allow-empty", "-m", "local")
+
+    def ahead():
+        status = daemon.probe(git_repo(repo_a, tmp_path))
+        return [branch["ahead"] for branch in status["branches"].values()]
+
+    assert ahead() == [1]
+    assert ahead() == [1]
+    git("push")
+    assert ahead() == [0]
+
+
+def test_serve_metrics_port(tmp_path):
+    daemon = Daemon(init_workspace(tmp_path))
+    probe_all(daemon)
+    server = daemon.serve_metrics(port=0)
+    host, port = server.server_address
+
+    try:
+        with urlopen(f"http://{host}:{port}/metrics") as response:
+            metrics = response.read().decode("utf-8")
+    finally:
+        daemon.stop()
+
+    assert "# TYPE toelpel_probe_duration_seconds histogram" in metrics
+    assert 'toelpel_probe_duration_seconds_bucket{le="+Inf"} 2' in metrics
+
+
+def test_serve_metrics_socket(tmp_path):
+    daemon = Daemon(init_workspace(tmp_path))
+    metrics_socket = tmp_path / "metrics.sock"
+    daemon.serve_metrics(socket=metrics_socket)
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(str(metrics_socket))
+            client.sendall(b"GET /metrics HTTP/1.0\r\n\r\n")
+            response = b""
+            while chunk := client.recv(4096):
+                response += chunk
+    finally:
+        daemon.stop()
+
+    assert response.startswith(b"HTTP/1.0 200")
+    assert b"toelpel_queue_depth 0" in response
+
+
+def test_serve_trend(tmp_path):
+    history = History(tmp_path / "workspace.history.jsonl")
+    daemon = Daemon(init_workspace(tmp_path), history=history)
+    probe_all(daemon)
+    (tmp_path / "repo_a" / "README.md").write_text("dirty")
+    probe_all(daemon)
+    server = daemon.serve_metrics(port=0)
+    host, port = server.server_address
+
+    try:
+        with urlopen(f"http://{host}:{port}/trend") as response:
+            trend = json.loads(response.read())
+    finally:
+        daemon.stop()
+
+    # both repositories were recorded once, then repo_a changed
+    assert len(trend) == 3
+    assert trend[1]["dirty"] == 1
+    assert trend[2]["dirty"] == 2
@@ -0,0 +1,237 @@
+"""An asyncio API for colonies and git repositories.
+
+The methods of `AsyncGit` return the same data structures as the properties of the
+`git` class, but run git with `asyncio.create_subprocess_exec`, so they do not block
+the event loop. The number of concurrent git processes is limited by a semaphore,
+that is shared by all repositories of an `AsyncColony`. When a task is cancelled,
+its running git process is killed.
+
+```
+colony = await AsyncColony.load(index, index.parent, jobs=8)
+async for status in colony.statuses():
+    print(status["repo"], status["dirty"])
+```
+"""
+
+import asyncio
+from contextlib import aclosing
+from pathlib import Path
+from subprocess import PIPE, CompletedProcess
+from time import perf_counter
+
+from .colony import Colony
+from .git import (
+    BRANCH_FORMAT,
+    git,
+    origin_url,
+    parse_branches,
+    parse_count,
+    parse_remotes,
+    remote_add_args,
+)
+from .parallel import DEFAULT_JOBS
+from .profile import profiler
+
+
+class AsyncGit:
+    def __init__(self, repo: git, semaphore: asyncio.Semaphore):
+        self.repo = repo
+        self.semaphore = semaphore
+
+    def __repr__(self) -> str:
+        return f"<async git repo at {self.path}>"
+
+    def __str__(self) -> str:
+        return str(self.repo)
+
+    @property
+    def path(self) -> Path:
+        return self.repo.path
+
+    @property
+    def relpath(self) -> Path:
+        return self.repo.relpath
+
+    async def run(self, *args) -> CompletedProcess:
+        """Run `git -C <path> *args` and return the result with decoded output."""
+        command = ["git", "-C", str(self.path), *args]
+        async with self.semaphore:
+            start = perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *command, stdout=PIPE, stderr=PIPE
+            )
+            try:
+                stdout, stderr = await process.communicate()
+            except asyncio.CancelledError:
+                process.kill()
+                await process.wait()
+                raise
+        result = CompletedProcess(
+            command,
+            process.returncode,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+        )
+        if profiler.enabled:
+            profiler.record_process(command, start, perf_counter() - start, result)
+        return result
+
+    async def is_repo(self) -> bool:
+        if not self.path.is_dir():
+            return False
+        return (await self.run("rev-parse")).returncode == 0
+
+    async def remotes(self) -> dict:
+        """See `git.remotes`."""
+        if not self.repo._remotes:
+            self.repo.remotes = parse_remotes((await self.run("remote", "-v")).stdout)
+        return self.repo._remotes
+
+    async def branches(self) -> dict:
+        return parse_branches(
+            (await self.run("branch", "--format", BRANCH_FORMAT)).stdout
+        )
+
+    async def stashes(self) -> list:
+        return (await self.run("stash", "list")).stdout.splitlines()
+
+    async def dirty(self) -> str:
+        return (await self.run("status", "--porcelain")).stdout
+
+    async def ignorred_dirt(self) -> str:
+        return (await self.run("status", "--ignored", "--porcelain")).stdout
+
+    async def behind(self, branch, remote=None) -> int:
+        remote = remote or (await self.branches())[branch]
+        result = await self.run("rev-list", "--count", f"{branch}..{remote}")
+        return parse_count(result.stdout)
+
+    async def ahead(self, branch, remote=None) -> int:
+        remote = remote or (await self.branches())[branch]
+        result = await self.run("rev-list", "--count", f"{remote}..{branch}")
+        return parse_count(result.stdout)
+
+    async def status(self) -> dict:
+        """See `git.status`, the probes of the repository run concurrently."""
+        if not await self.is_repo():
+            return {"repo": str(self), "is_repo": False}
+        branches, dirty, ignorred_dirt, stashes, remotes = await asyncio.gather(
+            self.branches(),
+            self.dirty(),
+            self.ignorred_dirt(),
+            self.stashes(),
+            self.remotes(),
+        )
+
+        async def branch_status(branch, remote):
+            if not remote:
+                return branch, {"upstream": None, "behind": None, "ahead": None}
+            behind, ahead = await asyncio.gather(
+                self.behind(branch, remote), self.ahead(branch, remote)
+            )
+            return branch, {"upstream": remote, "behind": behind, "ahead": ahead}
+
+        branch_statuses = await asyncio.gather(
+            *(branch_status(branch, remote) for branch, remote in branches.items())
+        )
+        return {
+            "repo": str(self),
+            "is_repo": True,
+            "dirty": bool(dirty),
+            "ignorred_dirt": bool(ignorred_dirt),
+            "stashes": len(stashes),
+            "remotes": bool(remotes),
+            "branches": dict(branch_statuses),
+        }
+
+    async def fetch(self) -> CompletedProcess:
+        return await self.run("fetch", "--all")
+
+    async def clone(self, remotes=None) -> CompletedProcess | None:
+        """Clone the repository and set up its remotes, see `git.clone` and
+        `git.setup`."""
+        if remotes:
+            self.repo.remotes = remotes
+        remotes = await self.remotes()
+        origin = origin_url(remotes)
+        if origin is None:
+            return None
+        self.path.mkdir(parents=True, exist_ok=True)
+        result = await self.run("clone", origin, ".")
+        if result.returncode == 0:
+            for args in remote_add_args(remotes):
+                await self.run("remote", "add", *args)
+        return result
+
+
+class AsyncColony:
+    """An asynchronous view on a colony, that iterates its repositories as
+    `AsyncGit` objects sharing one semaphore."""
+
+    def __init__(self, colony: Colony, jobs: int = DEFAULT_JOBS):
+        self.colony = colony
+        self.semaphore = asyncio.Semaphore(jobs)
+
+    @classmethod
+    async def load(cls, index: str | Path, base: str | Path, jobs: int = DEFAULT_JOBS):
+        """Load the index in a thread, so that parsing does not block the loop."""
+        return cls(await asyncio.to_thread(Colony, index, base), jobs)
+
+    def to_list(self, working_dir: Path | None = None) -> list:
+        return [
+            AsyncGit(repo, self.semaphore)
+            for repo in self.colony.to_list(working_dir=working_dir)
+        ]
+
+    async def __aiter__(self):
+        for repo in self.to_list():
+            yield repo
+
+    async def _as_completed(self, func, working_dir: Path | None = None):
+        tasks = [
+            asyncio.create_task(self._tagged(repo, func))
+            for repo in self.to_list(working_dir)
+        ]
+        try:
+            for next_task in asyncio.as_completed(tasks):
+                yield await next_task
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _tagged(repo, func):
+        return repo, await func(repo)
+
+    async def statuses(self, working_dir: Path | None = None):
+        """Yield the status of each repository, as soon as it is probed.
+
+        Closing the generator or cancelling the consuming task cancels the pending
+        probes.
+        """
+        async with aclosing(
+            self._as_completed(lambda repo: repo.status(), working_dir)
+        ) as results:
+            async for _, status in results:
+                yield status
+
+    async def fetch(self, working_dir: Path | None = None):
+        """Fetch all cloned repositories, yield `(repo, result)` as they finish."""
+
+        async def fetch_cloned(repo):
+            return await repo.fetch() if await repo.is_repo() else None
+
+        async with aclosing(self._as_completed(fetch_cloned, working_dir)) as results:
+            async for repo, result in results:
+                yield repo, result
+
+    async def clone(self, working_dir: Path | None = None):
+        """Clone all repositories, yield `(repo, result)` as they finish."""
+
+        async def clone_repo(repo):
+            return await repo.clone(dict(self.colony.get_remotes(repo.repo)))
+
+        async with aclosing(self._as_completed(clone_repo, working_dir)) as results:
+            async for repo, result in results:
+                yield repo, result
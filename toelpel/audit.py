@@ -0,0 +1,61 @@
+from .git import git
+from .parallel import DEFAULT_JOBS, for_each_repo
+
+AT_RISK = ("commits", "stashes", "untracked", "modified")
+
+
+def ref_name(ref: str, branches: dict) -> str:
+    """The name of a ref as shown by `git log --format=%S`, tags are prefixed with
+    "tags/" to tell them from the branches."""
+    ref = ref.removeprefix("refs/heads/")
+    if ref == "HEAD" or ref in branches:
+        return ref
+    return f"tags/{ref.removeprefix('refs/tags/')}"
+
+
+def audit_repo(repo: git) -> dict | None:
+    """Find the data of a repository, that would be lost if it was deleted.
+
+    Returns None if nothing is at risk, otherwise a dict with the number of commits
+    that are on no remote, their size in bytes, the branches with these commits and
+    whether they have an upstream, the number of stashes and the number of untracked
+    and modified files. Commits only reachable from a tag or a detached HEAD are
+    listed under "tags/<name>" and "HEAD".
+    """
+    if not repo.path.is_dir() or not repo.is_repo:
+        return None
+    result = {
+        "repo": str(repo),
+        "commits": 0,
+        "size": 0,
+        "branches": {},
+        "stashes": len(repo.stashes),
+        "untracked": 0,
+        "modified": 0,
+    }
+    for line in repo.dirty.splitlines():
+        if line.startswith("??"):
+            result["untracked"] += 1
+        else:
+            result["modified"] += 1
+    unpushed = repo.unpushed
+    if unpushed:
+        upstreams = repo.branches
+        result["commits"] = sum(unpushed.values())
+        result["size"] = repo.unpushed_size
+        for ref, count in unpushed.items():
+            name = ref_name(ref, upstreams)
+            result["branches"][name] = {
+                "commits": count,
+                "upstream": upstreams.get(name),
+            }
+    if any(result[key] for key in AT_RISK):
+        return result
+    return None
+
+
+def audit_repos(repos, jobs: int = DEFAULT_JOBS):
+    """Audit all repositories in parallel and yield the ones with data at risk."""
+    for _, result in for_each_repo(audit_repo, repos, jobs):
+        if result is not None:
+            yield result
@@ -0,0 +1,121 @@
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+
+from loguru import logger
+
+from .colony import INDEX_DEFAULT_NAME, Colony
+from .git import git
+from .parallel import DEFAULT_JOBS, for_each_repo
+
+MANIFEST_NAME = "manifest.json"
+
+
+def load_manifest(bundle_dir: Path) -> dict:
+    manifest_file = Path(bundle_dir) / MANIFEST_NAME
+    if not manifest_file.exists():
+        return {"repos": {}}
+    return json.loads(manifest_file.read_text())
+
+
+def bundle_repo(repo: git, bundle_dir: Path, entry: dict | None = None) -> dict:
+    """Create a bundle of the repository and return its manifest entry.
+
+    If there is an entry from a previous run, only the objects that are new since
+    then are bundled. If nothing changed, no bundle is created.
+    """
+    refs = repo.refs
+    if not refs:
+        raise ValueError(f"{repo} has no refs to bundle")
+    new_entry = {
+        "refs": refs,
+        "head": repo.head,
+        "upstreams": {
+            branch: upstream for branch, upstream in repo.branches.items() if upstream
+        },
+        "remotes": dict(repo.remotes),
+        "bundles": list(entry["bundles"]) if entry else [],
+    }
+    if entry and entry["refs"] == refs:
+        return new_entry
+
+    bundle_file = Path(str(repo.relpath)) / f"{len(new_entry['bundles']):04d}.bundle"
+    (bundle_dir / bundle_file).parent.mkdir(parents=True, exist_ok=True)
+    prerequisites = set(entry["refs"].values()) if entry else set()
+    result = repo.create_bundle(bundle_dir / bundle_file, prerequisites)
+    if result.returncode and "empty bundle" in result.stderr:
+        # only refs were deleted or rewound, there are no new objects
+        return new_entry
+    if result.returncode and prerequisites:
+        logger.info(f"Incremental bundle of {repo} failed, creating a full bundle")
+        new_entry["bundles"] = []
+        bundle_file = bundle_file.with_name(f"{0:04d}.bundle")
+        result = repo.create_bundle(bundle_dir / bundle_file)
+    if result.returncode:
+        raise RuntimeError(f"Bundling {repo} failed: {result.stderr.strip()}")
+    new_entry["bundles"].append(str(bundle_file))
+    return new_entry
+
+
+def bundle_colony(
+    store: Colony,
+    bundle_dir: Path,
+    working_dir: Path | None = None,
+    incremental: bool = True,
+    jobs: int = DEFAULT_JOBS,
+    on_error=None,
+) -> dict:
+    """Create bundles of all repositories in parallel and write the manifest.
+
+    The bundle directory contains a bundle series per repository, a `manifest.json`
+    with the refs, HEAD, upstreams and remotes of each repository and a copy of the
+    index, so that it is self-contained. With `incremental`, the bundles only
+    contain the objects that are new since the last run. If bundling a repository
+    fails, `on_error` is called with the repository and the error, the manifest
+    keeps its previous entry.
+    """
+    bundle_dir = Path(bundle_dir)
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(bundle_dir) if incremental else {"repos": {}}
+
+    def bundle_cloned(repo):
+        if not repo.path.is_dir() or not repo.is_repo:
+            return None
+        entry = manifest["repos"].get(str(repo.relpath))
+        try:
+            return bundle_repo(repo, bundle_dir, entry)
+        except ValueError as error:
+            # there is nothing to bundle
+            logger.warning(error)
+        except RuntimeError as error:
+            if on_error is None:
+                raise
+            on_error(repo, error)
+        return None
+
+    repos = list(store.to_list(working_dir=working_dir))
+    for repo, entry in for_each_repo(bundle_cloned, repos, jobs):
+        if entry is not None:
+            manifest["repos"][str(repo.relpath)] = entry
+    manifest["created"] = datetime.now(UTC).isoformat()
+    (bundle_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+
+    for repo in repos:
+        repo.remotes = store.get_remotes(repo)
+    Colony(bundle_dir / INDEX_DEFAULT_NAME, store.base).update_from_list(repos)
+    return manifest
+
+
+def restore_repo(repo: git, bundle_dir: Path, entry: dict):
+    """Restore a repository from its bundles and set up its remotes."""
+    repo.path.mkdir(parents=True, exist_ok=True)
+    result = repo.restore_bundles(
+        [bundle_dir / bundle_file for bundle_file in entry["bundles"]], entry["head"]
+    )
+    if result.returncode:
+        raise RuntimeError(f"Restoring {repo} failed: {result.stderr.strip()}")
+    if not repo.remotes:
+        repo.remotes = entry["remotes"]
+    repo.setup()
+    for branch, upstream in entry["upstreams"].items():
+        repo.set_upstream(branch, upstream)
@@ -1,24 +1,86 @@
 import json
-from os import walk
+from datetime import datetime
+from os import cpu_count, nice
 from pathlib import Path
-from shutil import copyfile
-from subprocess import DEVNULL, run
 from sys import stderr
 
 import click
 from loguru import logger
 
-from .colony import Colony, find_index
-from .git import git
-from .output import print_table
+from .audit import audit_repos
+from .bundle import bundle_colony, load_manifest, restore_repo
+from .colony import Colony, find_index, reconcile, scan_colony
+from .daemon import Daemon
+from .du import cache_path, disk_usage_repos
+from .federation import CONFIG_PATH, Federation
+from .history import History, history_path
+from .maintenance import MAINTENANCE_TASKS, maintain_repos
+from .output import (
+    print_audit_table,
+    print_du_table,
+    print_maintenance_table,
+    print_reconcile_table,
+    print_status_table,
+    print_table,
+    print_update_table,
+)
+from .parallel import (
+    DEFAULT_JOBS,
+    CommandRunner,
+    for_each_repo,
+    grep,
+    repo_filter,
+)
+from .profile import profiler
+from .update import update_repos
 
 
 @click.group()
-def cli():
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Record the git processes and print a summary at exit.",
+)
+@click.option(
+    "--profile-output",
+    default=None,
+    type=click.Path(path_type=Path),
+    help="Also write the recorded profile to this file.",
+)
+@click.option(
+    "--profile-format",
+    default="json",
+    type=click.Choice(["json", "chrome"]),
+    help='The format of the profile file, "chrome" writes a Chrome trace.',
+)
+@click.option(
+    "-c",
+    "--config",
+    default=CONFIG_PATH,
+    envvar="TOELPEL_CONFIG",
+    type=click.Path(path_type=Path),
+    help="The user configuration, which lists the workspaces of the federation.",
+)
+@click.pass_context
+def cli(ctx, profile, profile_output, profile_format, config):
     """Tölpel
 
     Get an overview on your git repositories and manage them from one place.
     """
+    ctx.ensure_object(dict)
+    ctx.obj["config"] = config
+    if profile or profile_output:
+        profiler.enable()
+
+        def report():
+            profiler.disable()
+            profiler.print_summary()
+            if profile_output:
+                profiler.export(profile_output, profile_format)
+
+        ctx.call_on_close(report)
+
     loglevel = "DEBUG"
     logfile = None
     logfilelevel = "DEBUG"
@@ -28,7 +90,26 @@ def cli():
         logger.add(logfile, level=logfilelevel)
 
 
-def locate_root_and_index(rootdir: Path | None = None, index: Path | None = None, workingdir: Path | None = None):
+class SeparatedCommand(click.Command):
+    """A command that takes all arguments after `--` as a separate list.
+
+    The separated arguments are available in `ctx.meta["separated_args"]`.
+    """
+
+    def parse_args(self, ctx, args):
+        if "--" in args:
+            position = args.index("--")
+            args, ctx.meta["separated_args"] = args[:position], args[position + 1 :]
+        else:
+            ctx.meta["separated_args"] = []
+        return super().parse_args(ctx, args)
+
+
+def locate_root_and_index(
+    rootdir: Path | None = None,
+    index: Path | None = None,
+    workingdir: Path | None = None,
+):
     if isinstance(rootdir, str):
         rootdir = Path(rootdir)
     if isinstance(index, str):
@@ -49,37 +130,30 @@ def locate_root_and_index(rootdir: Path | None = None, index: Path | None = None
 
 
 @cli.command()
-@click.argument("working_dir", type=click.Path(exists=True))
+@click.argument(
+    "working_dir", type=click.Path(exists=True), default=None, required=False
+)
 @click.option("-r", "--rootdir", type=click.Path(exists=True))
 @click.option("-i", "--index", type=click.Path(exists=False))
 @click.option("-d", "--discover", flag_value=True)
-def scan(working_dir, rootdir, index, discover):
+@click.option(
+    "-F", "--federated", is_flag=True, help="Scan all workspaces of the federation."
+)
+@click.option("-j", "--jobs", default=DEFAULT_JOBS, help="Number of parallel scans.")
+@click.pass_context
+def scan(ctx, working_dir, rootdir, index, discover, federated, jobs):
     """Scan the repositories in an index and update the index."""
 
-    rootdir, index = locate_root_and_index(rootdir, index, working_dir)
+    if federated:
+        federation = Federation.from_config(ctx.obj["config"], jobs)
+        # one colony after the other, so that at most `jobs` threads are running
+        for store in federation.colonies.values():
+            scan_colony(store, discover, jobs)
+        return
 
-    store = Colony(index, rootdir)
-    if discover:
-        logger.info("Start discover")
-        git_repos = []
-        for subdir, dirs, files in walk(rootdir, topdown=True):
-            subdir_path = Path(subdir)
-            for dir in dirs.copy():
-                dir_path = Path(dir)
-                relative_path = subdir_path / dir_path
-                result = run(["git", "-C", relative_path, "rev-parse"], stderr=DEVNULL)
-                logger.debug(
-                    f"path: {subdir_path / dir_path}, result: {result.returncode}"
-                )
-                repo = git(subdir_path / dir_path)
-                if repo.is_repo:
-                    git_repos.append(repo)
-                    # prevent walk from further descending into this directory
-                    dirs.remove(dir)
-                    logger.debug("DEL")
-    else:
-        git_repos = store.to_list()
-    store.update_from_list(git_repos)
+    rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
+
+    scan_colony(Colony(index, rootdir), discover, jobs)
 
 
 @cli.command("list")
@@ -89,21 +163,124 @@ def scan(working_dir, rootdir, index, discover):
 )
 @click.option("-i", "--index", type=click.Path(exists=False))
 @click.option("-f", "--format", default="console")
-def list_repos(working_dir, rootdir, index, format):
+@click.option(
+    "-F", "--federated", is_flag=True, help="List all workspaces of the federation."
+)
+@click.option("-j", "--jobs", default=DEFAULT_JOBS, help="Number of parallel probes.")
+@click.option(
+    "--changed-since",
+    default=None,
+    metavar="TIME|last",
+    help="Only list the repositories whose status changed since an ISO time or the "
+    "last check.",
+)
+@click.pass_context
+def list_repos(
+    ctx, working_dir, rootdir, index, format, federated, jobs, changed_since
+):
     """List all repositories in an index with their respective status.
 
-    format is "console" per default, but could also be "plain" or "json" or things like
-    that.
+    format is "console" per default, but could also be "json" for a list of the
+    repository paths or "jsonl" to stream the status of each repository as a JSON
+    object per line, as soon as it is probed.
+
+    With --federated the repositories of all workspaces in the configuration are
+    listed, tagged with their workspace.
+
+    With --changed-since the statuses are recorded in the history next to the index
+    and only the repositories whose status changed since the given time or since the
+    last check ("last") are listed. Repositories whose fingerprint did not change
+    since the last check are not probed again.
     """
 
+    if federated and changed_since:
+        raise click.UsageError("--changed-since can not be used with --federated.")
+
+    if federated:
+        federation = Federation.from_config(ctx.obj["config"], jobs)
+        if format == "console":
+            print_status_table(
+                sorted(
+                    federation.statuses(),
+                    key=lambda status: (status["workspace"], status["repo"]),
+                )
+            )
+        elif format == "json":
+            print(
+                json.dumps(
+                    [
+                        {"workspace": name, "path": str(repo.path)}
+                        for name, repo in federation.to_list()
+                    ]
+                )
+            )
+        elif format == "jsonl":
+            for status in federation.statuses():
+                print(json.dumps(status), flush=True)
+        return
+
     rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
 
     store = Colony(index, rootdir)
 
-    if format == "console":
-        print_table(store.to_list(working_dir=working_dir))
+    if changed_since:
+        list_changed(store, index, working_dir, format, jobs, changed_since)
+    elif format == "console":
+        print_table(store.to_list(working_dir=working_dir), jobs)
     elif format == "json":
         print(json.dumps(list(store.to_list(working_dir=working_dir, plain=True))))
+    elif format == "jsonl":
+        for _, status in for_each_repo(
+            lambda repo: repo.status(), store.to_list(working_dir=working_dir), jobs
+        ):
+            print(json.dumps(status), flush=True)
+
+
+@cli.command()
+@click.argument(
+    "working_dir", type=click.Path(exists=True), default=None, required=False
+)
+@click.option(
+    "-r", "--rootdir", default=None, type=click.Path(exists=True, path_type=Path)
+)
+@click.option("-i", "--index", type=click.Path(exists=False))
+@click.option(
+    "-F", "--federated", is_flag=True, help="Fetch all workspaces of the federation."
+)
+@click.option("-j", "--jobs", default=DEFAULT_JOBS, help="Number of parallel fetches.")
+@click.pass_context
+def fetch(ctx, working_dir, rootdir, index, federated, jobs):
+    """Fetch all remotes of the repositories in an index."""
+
+    def fetch_cloned(repo):
+        if not repo.path.is_dir() or not repo.is_repo:
+            return None
+        return repo.fetch()
+
+    if federated:
+        federation = Federation.from_config(ctx.obj["config"], jobs)
+        results = (
+            (f"{name}: {repo}", result)
+            for name, repo, result in federation.for_each_repo(fetch_cloned)
+        )
+    else:
+        rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
+        store = Colony(index, rootdir)
+        results = for_each_repo(
+            fetch_cloned, store.to_list(working_dir=working_dir), jobs
+        )
+
+    failed = False
+    for repo, result in results:
+        if result is None:
+            continue
+        if result.returncode:
+            failed = True
+            click.echo(f"{repo}: {result.stderr.strip()}", err=True)
+        else:
+            logger.info(f"Fetched {repo}")
+    if failed:
+        ctx.exit(1)
 
 
 def complete_repository(ctx, param, incomplete):
@@ -138,11 +315,24 @@ def complete_repository(ctx, param, incomplete):
 @click.option(
     "-i", "--index", default=None, type=click.Path(exists=True, path_type=Path)
 )
-def clone(working_dir, rootdir, index, all, repository):
+@click.option(
+    "--from-bundles",
+    "bundle_dir",
+    default=None,
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    help="Restore the repositories from the bundles created by `toelpel bundle`.",
+)
+@click.option("-j", "--jobs", default=DEFAULT_JOBS, help="Number of parallel restores.")
+@click.pass_context
+def clone(ctx, working_dir, rootdir, index, all, repository, bundle_dir, jobs):
     """Clone repositories from an index.
     If the optional argument REPOSITORY is given as a relative path only this explicity
     repository is cloned.
-    If rootdir is given, they are cloned relative to the given root directory."""
+    If rootdir is given, they are cloned relative to the given root directory.
+    With --from-bundles the repositories are restored in parallel from local bundles
+    instead and afterwards their remotes are set up, repositories without a bundle
+    are cloned from their remotes. If a restore fails, the other repositories are
+    still restored and the exit code is 1."""
 
     logger.debug(f"repository: {repository}")
 
@@ -153,25 +343,534 @@ def clone(working_dir, rootdir, index, all, repository):
         )
         return False
 
-    rootdir, index = locate_root_and_index(rootdir, index, working_dir)
+    rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
 
     if index.parent != rootdir:
-        copyfile(index, rootdir / "workspace.ttl")
-        index = rootdir / "workspace.ttl"
-
-    store = Colony(index, rootdir)
+        store = Colony(index, index.parent).copy_to(rootdir / "workspace.ttl")
+    else:
+        store = Colony(index, rootdir)
     git_repos = store.to_list()
 
     if repository is not None:
         repository_path = Path.cwd() / repository
         git_repos = [repo for repo in git_repos if repo.path == repository_path]
 
-    for repo in git_repos:
-        logger.debug(f"Cloning {repo} at {repo.path} …")
-        repo.path.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(bundle_dir) if bundle_dir else {"repos": {}}
+
+    def clone_repo(repo):
         repo.remotes = store.get_remotes(repo)
-        repo.clone()
-        repo.setup()
+        entry = manifest["repos"].get(str(repo.relpath))
+        if entry:
+            logger.debug(f"Restoring {repo} at {repo.path} from bundles …")
+            try:
+                restore_repo(repo, bundle_dir, entry)
+            except RuntimeError as error:
+                return error
+        else:
+            logger.debug(f"Cloning {repo} at {repo.path} …")
+            repo.path.mkdir(parents=True, exist_ok=True)
+            repo.clone()
+            repo.setup()
+
+    failed = False
+    for _, error in for_each_repo(clone_repo, git_repos, jobs if bundle_dir else 1):
+        if error is not None:
+            failed = True
+            click.echo(error, err=True)
+    if failed:
+        ctx.exit(1)
+
+
+def list_changed(store, index, working_dir, format, jobs, changed_since):
+    history = History(history_path(index))
+    if changed_since == "last":
+        since = None
+    else:
+        try:
+            since = datetime.fromisoformat(changed_since)
+        except ValueError:
+            raise click.BadParameter(
+                "expected an ISO time or 'last'", param_hint="--changed-since"
+            )
+        if since.tzinfo is None:
+            since = since.astimezone()
+
+    def is_changed(repo):
+        repo_since = history.last_check(str(repo)) if changed_since == "last" else since
+        return history.changed_since(str(repo), repo_since)
+
+    with profiler.phase("probe"):
+        changed = [
+            (repo, status)
+            for repo, status in history.probe_repos(
+                store.to_list(working_dir=working_dir), jobs
+            )
+            if is_changed(repo)
+        ]
+    base = store.base.absolute()
+    if base.is_relative_to(working_dir):
+        history.check()
+    elif working_dir.is_relative_to(base):
+        history.check(working_dir.relative_to(base))
+    changed.sort(key=lambda item: item[1]["repo"])
+
+    if format == "console":
+        print_status_table(status for _, status in changed)
+    elif format == "json":
+        print(json.dumps([str(repo.path) for repo, _ in changed]))
+    elif format == "jsonl":
+        for _, status in changed:
+            print(json.dumps(status))
+
+
+@cli.command()
+@click.argument(
+    "working_dir", type=click.Path(exists=True), default=None, required=False
+)
+@click.option(
+    "-r", "--rootdir", default=None, type=click.Path(exists=True, path_type=Path)
+)
+@click.option("-i", "--index", type=click.Path(exists=False))
+@click.option(
+    "--interval", default=60.0, help="Seconds between two probes of all repositories."
+)
+@click.option("-j", "--jobs", default=4, help="Number of repositories probed at once.")
+@click.option(
+    "--metrics-port", default=None, type=int, help="Serve metrics on this local port."
+)
+@click.option(
+    "--metrics-socket",
+    default=None,
+    type=click.Path(path_type=Path),
+    help="Serve metrics on this Unix socket.",
+)
+@click.option(
+    "--maintenance-interval",
+    default=None,
+    type=float,
+    help="Run git maintenance on all repositories every this many seconds.",
+)
+@click.option(
+    "--history/--no-history",
+    default=True,
+    help="Record the changed statuses in the history next to the index.",
+)
+def daemon(
+    working_dir,
+    rootdir,
+    index,
+    interval,
+    jobs,
+    metrics_port,
+    metrics_socket,
+    maintenance_interval,
+    history,
+):
+    """Monitor the repositories in an index.
+
+    The metrics of the daemon can be served in the Prometheus text format at
+    `/metrics`, the number of repositories per state over time as JSON at `/trend`.
+    """
+
+    rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
+
+    monitor = Daemon(
+        Colony(index, rootdir),
+        interval=interval,
+        jobs=jobs,
+        working_dir=working_dir,
+        maintenance_interval=maintenance_interval,
+        history=History(history_path(index)) if history else None,
+    )
+    if metrics_port is not None:
+        monitor.serve_metrics(port=metrics_port)
+    if metrics_socket is not None:
+        monitor.serve_metrics(socket=metrics_socket)
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        monitor.stop()
+
+
+@cli.command("exec", cls=SeparatedCommand)
+@click.argument(
+    "working_dir", type=click.Path(exists=True), default=None, required=False
+)
+@click.option(
+    "-r", "--rootdir", default=None, type=click.Path(exists=True, path_type=Path)
+)
+@click.option("-i", "--index", type=click.Path(exists=False))
+@click.option("-j", "--jobs", default=DEFAULT_JOBS, help="Number of parallel commands.")
+@click.option("--dirty", is_flag=True, help="Only repositories with changes.")
+@click.option("--behind", is_flag=True, help="Only repositories behind a remote.")
+@click.option("--has-remote", is_flag=True, help="Only repositories with a remote.")
+@click.option(
+    "--prefix",
+    is_flag=True,
+    help="Print the output line by line prefixed with the repository.",
+)
+@click.pass_context
+def exec_command(
+    ctx, working_dir, rootdir, index, jobs, dirty, behind, has_remote, prefix
+):
+    """Run a command in all repositories of an index.
+
+    The command is given after `--`, e.g. `toelpel exec -- git pull`. It is run in
+    parallel in each repository below WORKING_DIR. The exit code is 1 if the command
+    failed in any repository.
+    """
+    command = ctx.meta["separated_args"]
+    if not command:
+        raise click.UsageError("Specify the command to run after --.")
+
+    rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
+
+    store = Colony(index, rootdir)
+    selected = repo_filter(dirty=dirty, behind=behind, has_remote=has_remote)
+    runner = CommandRunner(command, click.echo, prefix=prefix)
+
+    def run_selected(repo):
+        return runner(repo) if selected(repo) else None
+
+    failed = []
+    for repo, returncode in for_each_repo(
+        run_selected, store.to_list(working_dir=working_dir), jobs
+    ):
+        if returncode:
+            failed.append((repo, returncode))
+    if failed:
+        for repo, returncode in sorted(failed, key=lambda item: str(item[0])):
+            click.echo(f"{repo}: exit {returncode}", err=True)
+        ctx.exit(1)
+
+
+@cli.command("grep")
+@click.argument("pattern")
+@click.argument(
+    "working_dir", type=click.Path(exists=True), default=None, required=False
+)
+@click.option(
+    "-r", "--rootdir", default=None, type=click.Path(exists=True, path_type=Path)
+)
+@click.option("-i", "--index", type=click.Path(exists=False))
+@click.option("-j", "--jobs", default=DEFAULT_JOBS, help="Number of parallel searches.")
+@click.option(
+    "-n", "--limit", default=0, help="Stop after this many matches, 0 for no limit."
+)
+@click.option("--ignore-case", is_flag=True, help="Ignore case differences.")
+@click.option("-F", "--fixed-strings", is_flag=True, help="Match a fixed string.")
+@click.pass_context
+def grep_repos(
+    ctx, pattern, working_dir, rootdir, index, jobs, limit, ignore_case, fixed_strings
+):
+    """Search for PATTERN with `git grep` in all repositories of an index.
+
+    The matches are printed as they are found, with the file path prefixed by the
+    repository path. Like for `git grep`, the exit code is 1 if nothing matched and
+    2 if the search failed in any repository.
+    """
+
+    rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
+
+    store = Colony(index, rootdir)
+    args = []
+    if ignore_case:
+        args.append("--ignore-case")
+    if fixed_strings:
+        args.append("--fixed-strings")
+    matched = False
+    failed = []
+    for repo, line in grep(
+        store.to_list(working_dir=working_dir),
+        pattern,
+        args,
+        jobs,
+        limit,
+        on_error=lambda repo, error: failed.append((repo, error)),
+    ):
+        matched = True
+        click.echo(f"{repo}/{line}")
+    if failed:
+        for repo, error in sorted(failed, key=lambda item: str(item[0])):
+            click.echo(f"{repo}: {error}", err=True)
+        ctx.exit(2)
+    if not matched:
+        ctx.exit(1)
+
+
+@cli.command()
+@click.argument(
+    "working_dir", type=click.Path(exists=True), default=None, required=False
+)
+@click.option(
+    "-r", "--rootdir", default=None, type=click.Path(exists=True, path_type=Path)
+)
+@click.option("-i", "--index", type=click.Path(exists=False))
+@click.option(
+    "-j",
+    "--jobs",
+    default=max(1, (cpu_count() or 1) // 2),
+    help="Number of repositories maintained at once.",
+)
+@click.option(
+    "--nice",
+    "niceness",
+    default=10,
+    help="Lower the CPU priority, and with it the I/O priority, by this value.",
+)
+@click.option(
+    "-t",
+    "--task",
+    "tasks",
+    multiple=True,
+    default=MAINTENANCE_TASKS,
+    help="The `git maintenance` tasks to run.",
+)
+@click.option(
+    "--untracked-cache/--no-untracked-cache",
+    default=True,
+    help="Enable core.untrackedCache where it is not configured.",
+)
+@click.option(
+    "--fsmonitor/--no-fsmonitor",
+    default=True,
+    help="Enable core.fsmonitor where it is not configured and supported.",
+)
+def maintain(
+    working_dir, rootdir, index, jobs, niceness, tasks, untracked_cache, fsmonitor
+):
+    """Run git maintenance in all repositories to speed up status queries.
+
+    Writes commit-graphs, packs loose objects and repacks incrementally, and enables
+    the untracked cache and the file system monitor. The time to probe the status
+    of each repository is reported before and after the maintenance.
+    """
+
+    rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
+
+    if niceness:
+        nice(niceness)
+    store = Colony(index, rootdir)
+    results = maintain_repos(
+        store.to_list(working_dir=working_dir),
+        jobs=jobs,
+        tasks=tasks,
+        untracked_cache=untracked_cache,
+        fsmonitor=fsmonitor,
+    )
+    print_maintenance_table(list(results))
+
+
+@cli.command()
+@click.argument(
+    "subtree", type=click.Path(exists=True, file_okay=False, path_type=Path)
+)
+@click.option(
+    "-r", "--rootdir", default=None, type=click.Path(exists=True, path_type=Path)
+)
+@click.option("-i", "--index", type=click.Path(exists=False))
+def shard(subtree, rootdir, index):
+    """Move the repositories below SUBTREE into a separate index file.
+
+    The index references the new `workspaces.ttl` in SUBTREE, which is only loaded
+    by commands that work on that subtree.
+    """
+
+    rootdir, index, _ = locate_root_and_index(rootdir, index)
+
+    store = Colony(index, rootdir)
+    shard_store = store.add_shard(subtree.absolute())
+    logger.info(f"Created shard {shard_store.index}")
+
+
+@cli.command("reconcile")
+@click.argument(
+    "working_dir", type=click.Path(exists=True), default=None, required=False
+)
+@click.option(
+    "-r", "--rootdir", default=None, type=click.Path(exists=True, path_type=Path)
+)
+@click.option("-i", "--index", type=click.Path(exists=False))
+@click.option(
+    "-f", "--format", default="console", type=click.Choice(["console", "json"])
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    help="Also verify with git, that the indexed repositories are valid.",
+)
+@click.option("-j", "--jobs", default=DEFAULT_JOBS, help="Number of parallel checks.")
+def reconcile_repos(working_dir, rootdir, index, format, verify, jobs):
+    """Compare the index with the repositories on disk.
+
+    Lists the indexed repositories that are missing on disk or are broken, i.e. are
+    not a git repository, and the repositories on disk that are not in the index.
+    """
+
+    rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
+
+    result = reconcile(Colony(index, rootdir), working_dir, verify, jobs)
+    if format == "json":
+        print(json.dumps(result))
+    else:
+        print_reconcile_table(result)
+
+
+@cli.command("bundle")
+@click.argument("bundle_dir", type=click.Path(file_okay=False, path_type=Path))
+@click.argument(
+    "working_dir", type=click.Path(exists=True), default=None, required=False
+)
+@click.option(
+    "-r", "--rootdir", default=None, type=click.Path(exists=True, path_type=Path)
+)
+@click.option("-i", "--index", type=click.Path(exists=False))
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Create full bundles, instead of bundles with the changes since the last run.",
+)
+@click.option("-j", "--jobs", default=DEFAULT_JOBS, help="Number of parallel bundles.")
+@click.pass_context
+def bundle_repos(ctx, bundle_dir, working_dir, rootdir, index, full, jobs):
+    """Create git bundles of all repositories in BUNDLE_DIR.
+
+    Besides the bundles, BUNDLE_DIR contains a manifest and a copy of the index. If
+    BUNDLE_DIR contains bundles from a previous run, only the changes since then are
+    bundled. The repositories can be restored with `toelpel clone --from-bundles`.
+    The exit code is 1 if bundling failed for any repository.
+    """
+
+    rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
+
+    failed = []
+    manifest = bundle_colony(
+        Colony(index, rootdir),
+        bundle_dir,
+        working_dir,
+        not full,
+        jobs,
+        on_error=lambda repo, error: failed.append((repo, error)),
+    )
+    logger.info(f"Bundled {len(manifest['repos'])} repositories in {bundle_dir}")
+    if failed:
+        for repo, error in sorted(failed, key=lambda item: str(item[0])):
+            click.echo(error, err=True)
+        ctx.exit(1)
+
+
+@cli.command()
+@click.argument(
+    "working_dir", type=click.Path(exists=True), default=None, required=False
+)
+@click.option(
+    "-r", "--rootdir", default=None, type=click.Path(exists=True, path_type=Path)
+)
+@click.option("-i", "--index", type=click.Path(exists=False))
+@click.option("-j", "--jobs", default=DEFAULT_JOBS, help="Number of parallel updates.")
+@click.option(
+    "-a",
+    "--all-branches",
+    is_flag=True,
+    help="Also fast-forward the tracking branches, that are not checked out.",
+)
+def update(working_dir, rootdir, index, jobs, all_branches):
+    """Fast-forward the repositories, that are clean and behind their upstream.
+
+    Only the fetched state of the upstreams is used, run `toelpel fetch` before.
+    Dirty repositories and diverged branches are skipped and listed.
+    """
+
+    rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
+
+    store = Colony(index, rootdir)
+    print_update_table(
+        update_repos(store.to_list(working_dir=working_dir), all_branches, jobs)
+    )
+
+
+@cli.command()
+@click.argument(
+    "working_dir", type=click.Path(exists=True), default=None, required=False
+)
+@click.option(
+    "-r", "--rootdir", default=None, type=click.Path(exists=True, path_type=Path)
+)
+@click.option("-i", "--index", type=click.Path(exists=False))
+@click.option(
+    "-f", "--format", default="console", type=click.Choice(["console", "json"])
+)
+@click.option("-j", "--jobs", default=DEFAULT_JOBS, help="Number of parallel audits.")
+def audit(working_dir, rootdir, index, format, jobs):
+    """List the repositories with work, that would be lost if they were deleted.
+
+    These are repositories with commits that are on no remote, stashes, untracked
+    or modified files. The commits of branches, tags and a detached HEAD are
+    counted. For the branches with unpushed commits, it is shown if they have an
+    upstream (× if not).
+    """
+
+    rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
+
+    store = Colony(index, rootdir)
+    results = audit_repos(store.to_list(working_dir=working_dir), jobs)
+    if format == "json":
+        print(json.dumps(sorted(results, key=lambda result: result["repo"])))
+    else:
+        print_audit_table(results)
+
+
+DU_SORT_KEYS = {
+    "total": lambda result: -(result["objects"] + result["worktree"]),
+    "objects": lambda result: -result["objects"],
+    "worktree": lambda result: -result["worktree"],
+    "repo": lambda result: result["repo"],
+}
+
+
+@cli.command()
+@click.argument(
+    "working_dir", type=click.Path(exists=True), default=None, required=False
+)
+@click.option(
+    "-r", "--rootdir", default=None, type=click.Path(exists=True, path_type=Path)
+)
+@click.option("-i", "--index", type=click.Path(exists=False))
+@click.option(
+    "-f", "--format", default="console", type=click.Choice(["console", "jsonl"])
+)
+@click.option(
+    "-s", "--sort", default="total", type=click.Choice(list(DU_SORT_KEYS.keys()))
+)
+@click.option(
+    "--cache/--no-cache", default=True, help="Use the cached object store sizes."
+)
+@click.option(
+    "-j", "--jobs", default=DEFAULT_JOBS, help="Number of parallel measurements."
+)
+def du(working_dir, rootdir, index, format, sort, cache, jobs):
+    """Show the disk usage of the object store and the work tree per repository.
+
+    The repositories are sorted by size, largest first, or by path. With the jsonl
+    format, the results are streamed as they are measured. Repositories that would
+    benefit from `git gc` are marked. The object store statistics are cached next
+    to the index and only queried again if the object store changed, the work tree
+    is always measured.
+    """
+
+    rootdir, index, working_dir = locate_root_and_index(rootdir, index, working_dir)
+
+    store = Colony(index, rootdir)
+    results = disk_usage_repos(
+        store.to_list(working_dir=working_dir),
+        cache_path(index) if cache else None,
+        jobs,
+    )
+    if format == "jsonl":
+        for result in results:
+            print(json.dumps(result), flush=True)
+    else:
+        print_du_table(sorted(results, key=DU_SORT_KEYS[sort]))
 
 
 if __name__ == "__main__":
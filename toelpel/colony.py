@@ -1,4 +1,6 @@
+from collections import defaultdict
 from itertools import chain
+from os import walk
 from pathlib import Path
 
 from loguru import logger
@@ -6,6 +8,8 @@ from rdflib import Graph, URIRef
 from rdflib.namespace import RDF, Namespace
 
 from .git import git
+from .parallel import DEFAULT_JOBS, for_each_repo
+from .profile import profiler
 
 TOEL = Namespace("https://toelpel/")
 RELPATH = "path:"
@@ -32,6 +36,39 @@ def find_index(rootdir: Path | None = None, working_dir: Path | None = None):
     return None
 
 
+def find_repo_candidates(rootdir: Path):
+    """Walk the directory tree below rootdir and yield all directories that contain
+    a `.git` directory or file.
+
+    No git process is started, so the candidates are not verified to be valid
+    repositories. The walk does not descend into the candidates, so nested
+    repositories are not found.
+    """
+    for subdir, dirs, _ in walk(rootdir, topdown=True):
+        subdir_path = Path(subdir)
+        for dir in dirs.copy():
+            if dir == ".git":
+                dirs.remove(dir)
+                continue
+            candidate = subdir_path / dir
+            if (candidate / ".git").exists():
+                yield candidate
+                # prevent walk from further descending into this directory
+                dirs.remove(dir)
+
+
+def discover_repos(rootdir: Path, jobs: int = DEFAULT_JOBS):
+    """Walk the directory tree below rootdir and yield all git repositories."""
+    for repo, is_repo in for_each_repo(
+        lambda repo: repo.is_repo,
+        (git(candidate) for candidate in find_repo_candidates(rootdir)),
+        jobs,
+    ):
+        logger.debug(f"path: {repo.path}, is_repo: {is_repo}")
+        if is_repo:
+            yield repo
+
+
 def uri_to_path(uri):
     if isinstance(uri, URIRef):
         uri_str = str(uri)
@@ -63,12 +100,110 @@ class Colony:
         index = find_index()
         store = Colony(index, index.parent)
         ```
+
+        The index can be sharded: a subtree of the space can have its own index file,
+        that is referenced from the index with a `toel:shard` statement:
+        ```
+        <path:team-a> toel:shard <path:team-a/workspaces.ttl> .
+        ```
+        The subject is the path of the subtree relative to the base, the object is
+        the path of the index file relative to the directory of the index. A shard is
+        a complete index for its subtree, so it can also be used on its own. Shards
+        are only loaded, when they are needed, e.g. when `to_list` is called with a
+        `working_dir` that intersects the subtree.
         """
         self.index = Path(index)
         self.base = Path(base)
         self.graph = Graph()
+        self.graph.bind("toel", TOEL)
+        self.shard_indexes = {}
+        self._shards = {}
         if self.index.exists():
-            self.graph.parse(self.index, format="turtle")
+            with profiler.phase("index load"):
+                self.graph.parse(self.index, format="turtle")
+        for subtree, _, shard_index in self.graph.triples((None, TOEL["shard"], None)):
+            self.shard_indexes[Path(uri_to_path(subtree))] = self.index.parent / Path(
+                uri_to_path(shard_index)
+            )
+
+    def get_shard(self, subtree: Path) -> "Colony":
+        """Get the colony of the shard for the subtree, load it if necessary."""
+        if subtree not in self._shards:
+            shard_index = self.shard_indexes[subtree]
+            if not shard_index.exists():
+                logger.error(
+                    f"The index {shard_index} of the shard {subtree} is missing."
+                )
+            self._shards[subtree] = Colony(shard_index, self.base / subtree)
+        return self._shards[subtree]
+
+    def find_shard(self, path: Path) -> Path | None:
+        """Find the subtree of the shard, that contains the path, if any."""
+        relpath = self.get_relpath(path)
+        for subtree in self.shard_indexes:
+            if relpath.is_relative_to(subtree):
+                return subtree
+        return None
+
+    def add_shard(self, path: Path) -> "Colony":
+        """Move the repositories below path into a new shard.
+
+        The shard index is written to `workspaces.ttl` in the corresponding directory
+        below the directory of the index. If the path is already part of a shard, the
+        shard is split further.
+        """
+        subtree = self.find_shard(path)
+        if subtree is not None:
+            return self.get_shard(subtree).add_shard(path)
+
+        subtree = self.get_relpath(path)
+        shard_index = self.index.parent / subtree / INDEX_DEFAULT_NAME
+        shard_index.parent.mkdir(parents=True, exist_ok=True)
+        self.shard_indexes[subtree] = shard_index
+        shard = self._shards[subtree] = Colony(shard_index, self.base / subtree)
+
+        prefixes = [
+            (f"{prefix}{subtree}/", prefix) for prefix in [RELPATH, URN_RELPATH]
+        ]
+
+        def rebase(node):
+            for old_prefix, new_prefix in prefixes:
+                if isinstance(node, URIRef) and str(node).startswith(old_prefix):
+                    return URIRef(new_prefix + str(node)[len(old_prefix) :])
+            return node
+
+        for triple in list(self.graph):
+            subject, predicate, value = triple
+            if rebase(subject) is not subject:
+                self.graph.remove(triple)
+                shard.graph.add((rebase(subject), predicate, rebase(value)))
+        self.graph.add(
+            (
+                URIRef(RELPATH + str(subtree)),
+                TOEL["shard"],
+                URIRef(RELPATH + str(shard_index.relative_to(self.index.parent))),
+            )
+        )
+        with profiler.phase("index save"):
+            shard.graph.serialize(shard.index, format="turtle")
+            self.graph.serialize(self.index, format="turtle")
+        return shard
+
+    def copy_to(self, index: Path) -> "Colony":
+        """Copy the index and its shards, e.g. to clone the space to another base.
+
+        The shard index files keep their paths relative to the directory of the index.
+        Returns the colony of the copy with the directory of the index as its base.
+        """
+        index = Path(index)
+        index.parent.mkdir(parents=True, exist_ok=True)
+        with profiler.phase("index save"):
+            self.graph.serialize(index, format="turtle")
+        for subtree, shard_index in self.shard_indexes.items():
+            shard = self.get_shard(subtree)
+            if shard.index.exists():
+                shard.copy_to(index.parent / shard_index.relative_to(self.index.parent))
+        return Colony(index, index.parent)
 
     def get_abspath(self, relpath: URIRef) -> Path:
         return self.base / Path(uri_to_path(relpath))
@@ -82,8 +217,24 @@ class Colony:
         return URIRef(RELPATH + str(self.get_relpath(path)))
 
     def update_from_list(self, repos: list) -> Graph:
-        list(map(self.add_repo_to_graph, repos))
-        self.graph.serialize(self.index, format="turtle")
+        """Add the repositories to the index and write the index files.
+
+        Repositories below a shard are added to the shard. Only the index files that
+        changed are written.
+        """
+        shard_repos = defaultdict(list)
+        size = len(self.graph)
+        for repo in repos:
+            subtree = self.find_shard(repo.path)
+            if subtree is None:
+                self.add_repo_to_graph(repo)
+            else:
+                shard_repos[subtree].append(repo)
+        for subtree, subtree_repos in shard_repos.items():
+            self.get_shard(subtree).update_from_list(subtree_repos)
+        if len(self.graph) != size or not self.index.exists():
+            with profiler.phase("index save"):
+                self.graph.serialize(self.index, format="turtle")
         return self.graph
 
     def to_list(self, working_dir: Path | None = None, plain=False) -> list:
@@ -95,6 +246,16 @@ class Colony:
                 yield str(git(repo_abspath, self.base).path)
             else:
                 yield git(repo_abspath, self.base)
+        for subtree in self.shard_indexes:
+            shard_path = self.base / subtree
+            if (
+                working_dir
+                and not shard_path.is_relative_to(working_dir)
+                and not Path(working_dir).is_relative_to(shard_path)
+            ):
+                continue
+            for repo in self.get_shard(subtree).to_list(working_dir, plain):
+                yield repo if plain else git(repo.path, self.base)
 
     def add_repo_to_graph(self, repo: git):
         logger.debug(
@@ -109,6 +270,10 @@ class Colony:
                 self.graph.add((repo_resource_remote, TOEL[mirror], URIRef(url)))
 
     def get_remotes(self, repo: git):
+        subtree = self.find_shard(repo.path)
+        if subtree is not None:
+            yield from self.get_shard(subtree).get_remotes(repo)
+            return
         for _, _, remote in chain(
             self.graph.triples((self.get_relpath_iri(repo.path), TOEL["remote"], None)),
             self.graph.triples(
@@ -127,3 +292,75 @@ class Colony:
             logger.debug(fetch_url)
             logger.debug(push_url)
             yield remote_name, {"fetch": push_url, "push": push_url}
+
+
+def scan_colony(
+    store: Colony, discover: bool = False, jobs: int = DEFAULT_JOBS
+) -> Graph:
+    """Update the index of a colony from the repositories, if `discover` is set also
+    add the repositories in the directory tree that are not yet in the index, with
+    `jobs` repositories verified in parallel."""
+    if discover:
+        logger.info("Start discover")
+        git_repos = list(discover_repos(store.base, jobs))
+    else:
+        git_repos = store.to_list()
+    return store.update_from_list(git_repos)
+
+
+def reconcile(
+    store: Colony,
+    working_dir: Path | None = None,
+    verify: bool = False,
+    jobs: int = DEFAULT_JOBS,
+) -> dict:
+    """Compare the index with the repositories on disk below working_dir.
+
+    Returns a dict with sorted lists of relative paths:
+    - "missing": indexed repositories that do not exist on disk,
+    - "broken": indexed repositories that exist, but are not a git repository,
+    - "extra": git repositories on disk, that are not in the index.
+
+    The comparison is based on the presence of `.git`, git is only run to confirm
+    the extra repositories, and with `verify` also the indexed repositories. If
+    working_dir is not below the base of the colony, the whole base is compared.
+    """
+    working_dir = Path(working_dir or store.base)
+    if not working_dir.absolute().is_relative_to(store.base.absolute()):
+        working_dir = store.base
+    indexed = {repo.relpath: repo for repo in store.to_list(working_dir=working_dir)}
+
+    missing = set()
+    broken = set()
+    present = []
+    for relpath, repo in indexed.items():
+        if not repo.path.is_dir():
+            missing.add(relpath)
+        elif not (repo.path / ".git").exists():
+            broken.add(relpath)
+        else:
+            present.append(repo)
+    if verify:
+        for repo, is_repo in for_each_repo(lambda repo: repo.is_repo, present, jobs):
+            if not is_repo:
+                broken.add(repo.relpath)
+
+    candidates = (
+        git(candidate, store.base)
+        for candidate in find_repo_candidates(working_dir)
+        if candidate.relative_to(store.base) not in indexed
+    )
+    extra = {
+        repo.relpath
+        for repo, is_repo in for_each_repo(lambda repo: repo.is_repo, candidates, jobs)
+        if is_repo
+    }
+
+    return {
+        name: sorted(str(relpath) for relpath in relpaths)
+        for name, relpaths in [
+            ("missing", missing),
+            ("broken", broken),
+            ("extra", extra),
+        ]
+    }
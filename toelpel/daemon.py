@@ -0,0 +1,281 @@
+import json
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from queue import Empty, Queue
+from socketserver import ThreadingMixIn, UnixStreamServer
+from threading import Event, Lock, Thread
+from time import monotonic, perf_counter
+from urllib.parse import parse_qs, urlsplit
+
+from loguru import logger
+
+from .colony import Colony
+from .git import git
+from .history import History, status_flags
+from .maintenance import maintain_repos
+from .metrics import Registry
+
+RATE_WINDOW = 60
+
+
+class Daemon:
+    """A monitoring service, that periodically probes the status of all repositories
+    of a colony.
+
+    The repositories are put on a queue, from which a pool of worker threads takes
+    them to probe their status. The status of a repository is cached together with
+    its fingerprint, so that the branches of unchanged repositories are not probed
+    again. The work tree is probed each time, as the fingerprint does not cover it.
+    With a `History`, the changed statuses are recorded, which allows to query the
+    trend of the repository states.
+
+    ```
+    daemon = Daemon(Colony(index, index.parent), interval=60)
+    daemon.serve_metrics(port=9464)
+    daemon.run()
+    ```
+    """
+
+    def __init__(
+        self,
+        colony: Colony,
+        interval: float = 60,
+        jobs: int = 4,
+        working_dir: Path | None = None,
+        maintenance_interval: float | None = None,
+        history: History | None = None,
+    ):
+        self.colony = colony
+        self.interval = interval
+        self.jobs = jobs
+        self.working_dir = working_dir
+        self.maintenance_interval = maintenance_interval
+        self.history = history
+        self._maintenance = None
+        self._last_maintenance = None
+        self.queue = Queue()
+        self.cache = {}
+        self.stopped = Event()
+        self.servers = []
+        self._probe_times = deque()
+        self._lock = Lock()
+
+        self.metrics = Registry()
+        self.probe_latency = self.metrics.histogram(
+            "toelpel_probe_duration_seconds",
+            "Time to probe the status of a repository.",
+        )
+        self.probes = self.metrics.counter(
+            "toelpel_probes_total", "Number of repository probes."
+        )
+        self.probe_rate = self.metrics.gauge(
+            "toelpel_probes_per_second",
+            f"Probes per second over the last {RATE_WINDOW} seconds.",
+        )
+        self.queue_depth = self.metrics.gauge(
+            "toelpel_queue_depth", "Number of repositories waiting to be probed."
+        )
+        self.watchers = self.metrics.gauge(
+            "toelpel_watchers", "Number of repositories watched by the daemon."
+        )
+        self.cache_lookups = self.metrics.counter(
+            "toelpel_cache_lookups_total", "Status cache lookups by result."
+        )
+        self.cache_hit_rate = self.metrics.gauge(
+            "toelpel_cache_hit_ratio", "Ratio of status cache hits to all lookups."
+        )
+        self.repos = self.metrics.gauge(
+            "toelpel_repos", "Number of repositories per workspace and state."
+        )
+        self.maintenance_runs = self.metrics.counter(
+            "toelpel_maintenance_runs_total", "Number of maintained repositories."
+        )
+
+    def schedule(self):
+        """Put all watched repositories on the queue."""
+        repos = list(self.colony.to_list(working_dir=self.working_dir))
+        self.watchers.set(len(repos))
+        for repo in repos:
+            self.queue.put(repo)
+
+    def probe(self, repo: git) -> dict:
+        """Get the status of a repository.
+
+        If the fingerprint did not change, the branches and stashes are taken from
+        the cache and only the work tree is probed again.
+        """
+        fingerprint = repo.fingerprint
+        cached = self.cache.get(repo.path)
+        if (
+            fingerprint is not None
+            and cached
+            and cached[0] == fingerprint
+            and cached[1]["is_repo"]
+        ):
+            self.cache_lookups.inc(result="hit")
+            status = {**cached[1], **repo.worktree_status()}
+            self.cache[repo.path] = (fingerprint, status)
+            if self.history is not None:
+                self.history.record(str(repo), status, fingerprint)
+            return status
+        self.cache_lookups.inc(result="miss")
+
+        start = perf_counter()
+        status = repo.status()
+        self.probe_latency.observe(perf_counter() - start)
+        self.probes.inc()
+        with self._lock:
+            self._probe_times.append(monotonic())
+        self.cache[repo.path] = (fingerprint, status)
+        if self.history is not None:
+            self.history.record(str(repo), status, fingerprint)
+        return status
+
+    def update_metrics(self):
+        with self._lock:
+            while (
+                self._probe_times and self._probe_times[0] < monotonic() - RATE_WINDOW
+            ):
+                self._probe_times.popleft()
+            self.probe_rate.set(len(self._probe_times) / RATE_WINDOW)
+        self.queue_depth.set(self.queue.qsize())
+
+        lookups = dict(self.cache_lookups.samples)
+        hits = lookups.get((("result", "hit"),), 0)
+        misses = lookups.get((("result", "miss"),), 0)
+        self.cache_hit_rate.set(hits / (hits + misses) if hits + misses else 0)
+
+        counts = {"dirty": 0, "ahead": 0, "behind": 0, "not_a_repo": 0}
+        for _, status in list(self.cache.values()):
+            for state, flag in status_flags(status).items():
+                counts[state] += flag
+        for state, count in counts.items():
+            self.repos.set(count, workspace=str(self.colony.base), state=state)
+
+    def maintain(self):
+        """Start the maintenance of all repositories in the background, if it is due.
+
+        The maintenance runs one repository at a time, so that it does not compete
+        with the probes.
+        """
+        if not self.maintenance_interval:
+            return
+        if self._maintenance and self._maintenance.is_alive():
+            return
+        if (
+            self._last_maintenance is not None
+            and monotonic() - self._last_maintenance < self.maintenance_interval
+        ):
+            return
+        self._last_maintenance = monotonic()
+
+        def run_maintenance():
+            repos = self.colony.to_list(working_dir=self.working_dir)
+            for result in maintain_repos(repos, jobs=1):
+                logger.debug(f"Maintained {result}")
+                self.maintenance_runs.inc()
+                if self.stopped.is_set():
+                    break
+
+        self._maintenance = Thread(target=run_maintenance, daemon=True)
+        self._maintenance.start()
+
+    def work(self):
+        while not self.stopped.is_set():
+            try:
+                repo = self.queue.get(timeout=1)
+            except Empty:
+                continue
+            try:
+                self.probe(repo)
+            except Exception:
+                logger.exception(f"Probing {repo} failed")
+            finally:
+                self.queue.task_done()
+
+    def run(self):
+        """Probe all repositories every `interval` seconds until `stop` is called."""
+        workers = [Thread(target=self.work, daemon=True) for _ in range(self.jobs)]
+        for worker in workers:
+            worker.start()
+        while not self.stopped.is_set():
+            if self.queue.empty():
+                self.schedule()
+            self.maintain()
+            self.update_metrics()
+            self.stopped.wait(self.interval)
+        for worker in workers:
+            worker.join()
+
+    def stop(self):
+        self.stopped.set()
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def serve_metrics(self, port: int | None = None, socket: Path | None = None):
+        """Expose the metrics via HTTP on a local port or a Unix socket.
+
+        If the daemon has a history, the number of repositories per state after each
+        change is served as JSON at `/trend`, optionally `/trend?since=<ISO time>`.
+
+        Returns the server, its address is available as `server.server_address`.
+        """
+        daemon = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path == "/trend" and daemon.history is not None:
+                    self.send_trend(parse_qs(url.query).get("since"))
+                    return
+                if url.path != "/metrics":
+                    self.send_error(404)
+                    return
+                daemon.update_metrics()
+                self.send_body(daemon.metrics.expose(), "text/plain; version=0.0.4")
+
+            def send_trend(self, since):
+                try:
+                    since = datetime.fromisoformat(since[0]) if since else None
+                except ValueError:
+                    self.send_error(400, "since is not an ISO time")
+                    return
+                if since is not None and since.tzinfo is None:
+                    since = since.astimezone()
+                trend = daemon.history.trend(since)
+                self.send_body(json.dumps(trend), "application/json")
+
+            def send_body(self, body, content_type):
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def address_string(self):
+                return str(self.client_address or "unix")
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        if socket is not None:
+            Path(socket).unlink(missing_ok=True)
+            server = ThreadingUnixHTTPServer(str(socket), MetricsHandler)
+        else:
+            server = ThreadingHTTPServer(("127.0.0.1", port or 0), MetricsHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+        self.servers.append(server)
+        logger.info(f"Serving metrics on {server.server_address}")
+        return server
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ""
@@ -0,0 +1,90 @@
+import json
+from os import walk
+from pathlib import Path
+
+from .git import git
+from .parallel import DEFAULT_JOBS, for_each_repo
+
+CACHE_SUFFIX = ".du.json"
+
+# the thresholds of `git gc --auto`, see gc.auto and gc.autoPackLimit
+GC_LOOSE_OBJECTS = 6700
+GC_PACKS = 50
+
+
+def cache_path(index: Path) -> Path:
+    """The disk usage cache of an index is stored next to it, e.g.
+    `workspaces.du.json`."""
+    return Path(index).with_suffix(CACHE_SUFFIX)
+
+
+def worktree_size(path: Path) -> int:
+    """The size in bytes of the files in a work tree, without the git directory."""
+    size = 0
+    for dirpath, dirnames, filenames in walk(path):
+        if dirpath == str(path) and ".git" in dirnames:
+            dirnames.remove(".git")
+        for filename in filenames:
+            try:
+                size += Path(dirpath, filename).lstat().st_size
+            except FileNotFoundError:
+                continue
+    return size
+
+
+def object_usage(repo: git) -> dict:
+    """Measure the object store of a repository.
+
+    The size is in bytes. `gc` lists the reasons, why the repository would benefit
+    from `git gc`: too many loose objects or packs, or garbage in the object store.
+    """
+    objects = repo.count_objects
+    gc = []
+    if objects.get("count", 0) >= GC_LOOSE_OBJECTS:
+        gc.append("loose objects")
+    if objects.get("packs", 0) >= GC_PACKS:
+        gc.append("packs")
+    if objects.get("garbage", 0):
+        gc.append("garbage")
+    return {
+        "objects": 1024
+        * sum(objects.get(key, 0) for key in ["size", "size-pack", "size-garbage"]),
+        "loose": objects.get("count", 0),
+        "packs": objects.get("packs", 0),
+        "gc": gc,
+    }
+
+
+def disk_usage_repos(repos, cache_file: Path | None = None, jobs: int = DEFAULT_JOBS):
+    """Measure the object store and the work tree of all cloned repositories in
+    parallel.
+
+    Yields the results as they are finished. With a cache file, the statistics of
+    the object store are cached with its fingerprint, so that git is not run again
+    for unchanged repositories. The work tree is always measured, as its untracked
+    and ignored files are not covered by any fingerprint.
+    """
+    cache = {}
+    if cache_file is not None and Path(cache_file).exists():
+        cache = json.loads(Path(cache_file).read_text())
+
+    def measure(repo):
+        if not repo.path.is_dir():
+            return None
+        fingerprint = json.loads(json.dumps(repo.objects_fingerprint))
+        cached = cache.get(str(repo))
+        if fingerprint is not None and cached and cached["fingerprint"] == fingerprint:
+            objects = cached["objects"]
+        elif repo.is_repo:
+            objects = object_usage(repo)
+            if fingerprint is not None:
+                cache[str(repo)] = {"fingerprint": fingerprint, "objects": objects}
+        else:
+            return None
+        return {"repo": str(repo), **objects, "worktree": worktree_size(repo.path)}
+
+    for _, result in for_each_repo(measure, repos, jobs):
+        if result is not None:
+            yield result
+    if cache_file is not None:
+        Path(cache_file).write_text(json.dumps(cache))
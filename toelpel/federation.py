@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import click
+import yaml
+
+from .colony import Colony
+from .parallel import DEFAULT_JOBS, for_each_repo
+
+CONFIG_PATH = Path(click.get_app_dir("toelpel")) / "config.yaml"
+
+
+def load_config(path: Path = CONFIG_PATH) -> dict:
+    """Load the user configuration, an empty configuration if it does not exist."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path) as config_file:
+        return yaml.safe_load(config_file) or {}
+
+
+class Federation:
+    """A federation of several colonies, each with its own index and root directory.
+
+    The workspaces of the federation are configured in the user configuration
+    (`~/.config/toelpel/config.yaml` on Linux):
+    ```
+    workspaces:
+      work: ~/work/workspaces.ttl
+      archive:
+        index: /backup/archive.ttl
+        rootdir: ~/archive
+    ```
+    If no rootdir is given, it is the directory of the index.
+    """
+
+    def __init__(self, workspaces: dict, jobs: int = DEFAULT_JOBS):
+        """The workspaces map a name to a tuple `(index, rootdir)`. The indexes are
+        loaded concurrently."""
+        self.jobs = jobs
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                name: executor.submit(Colony, index, rootdir)
+                for name, (index, rootdir) in workspaces.items()
+            }
+        self.colonies = {name: future.result() for name, future in futures.items()}
+
+    @classmethod
+    def from_config(cls, path: Path = CONFIG_PATH, jobs: int = DEFAULT_JOBS):
+        """Create the federation of the workspaces in the user configuration.
+
+        Raises a `click.UsageError`, if no workspaces are configured.
+        """
+        workspaces = {}
+        config = load_config(path)
+        if not config.get("workspaces"):
+            raise click.UsageError(f"No workspaces are configured in {path}.")
+        for name, spec in config["workspaces"].items():
+            if not isinstance(spec, dict):
+                spec = {"index": spec}
+            index = Path(spec["index"]).expanduser()
+            rootdir = Path(spec.get("rootdir", index.parent)).expanduser()
+            workspaces[name] = (index, rootdir)
+        return cls(workspaces, jobs)
+
+    def to_list(self):
+        """Yield the tuples `(workspace, repo)` for the repositories of all colonies."""
+        for name, colony in self.colonies.items():
+            for repo in colony.to_list():
+                yield name, repo
+
+    def for_each_repo(self, func):
+        """Call `func` for each repository of all colonies concurrently.
+
+        Yields the tuples `(workspace, repo, result)` as the calls finish.
+        """
+        for (name, repo), result in for_each_repo(
+            lambda item: func(item[1]), self.to_list(), self.jobs
+        ):
+            yield name, repo, result
+
+    def statuses(self):
+        """Yield the status of all repositories tagged with the workspace, as they
+        are probed."""
+        for name, _, status in self.for_each_repo(lambda repo: repo.status()):
+            yield {"workspace": name, **status}
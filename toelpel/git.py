@@ -1,10 +1,73 @@
-from collections import defaultdict
+from collections import Counter, defaultdict
+from os import scandir, walk
 from pathlib import Path
-from subprocess import DEVNULL, run
+from subprocess import DEVNULL
 
 from loguru import logger
 
+from .profile import profiler
+
 ORIGIN = "origin"
+BRANCH_FORMAT = "%(refname:short) %(upstream)"
+# the local refs, whose commits are lost if the repository is deleted, the branches
+# are listed first, so that their names are shown for commits also reachable otherwise
+UNPUSHED_REFS = ["--branches", "--tags", "HEAD", "--not", "--remotes"]
+
+
+def parse_remotes(output: str) -> dict:
+    """Parse the output of `git remote -v` into the remotes dict of `git.remotes`."""
+    remotes = defaultdict(dict)
+    for line in output.splitlines():
+        values = line.split()
+        remotes[values[0]][values[2][1:-1]] = values[1]
+    return remotes
+
+
+def parse_branches(output: str) -> dict:
+    """Parse the output of `git branch --format BRANCH_FORMAT` into a dict of the
+    branches and their upstreams."""
+
+    def gen():
+        for line in output.splitlines():
+            branch_remote = line.split()
+            branch = branch_remote[0]
+            remote = branch_remote[1] if len(branch_remote) > 1 else None
+            yield branch, remote
+
+    return dict(gen())
+
+
+def parse_count(output: str) -> int:
+    """Parse the output of `git rev-list --count`."""
+    return int(output) if len(output) else 0
+
+
+def origin_url(remotes: dict) -> str | None:
+    """Select the URL to clone from, the origin or the only remote."""
+    if ORIGIN in remotes.keys():
+        return remotes[ORIGIN]["fetch"]
+    if len(remotes.keys()) == 1:
+        return next(iter(remotes.values()))["fetch"]
+    return None
+
+
+def remote_add_args(remotes: dict):
+    """Yield the arguments for `git remote add` to set up the remotes."""
+    for remote, remote_dict in remotes.items():
+        if remote_dict["push"] == remote_dict["fetch"]:
+            yield [remote, remote_dict["push"]]
+        else:
+            for mirror, url in remote_dict.items():
+                yield ["--mirror", mirror, remote, url]
+
+
+def stat_fingerprint(path: Path):
+    """The modification time and size of a file or directory, None if it is missing."""
+    try:
+        result = path.stat()
+    except FileNotFoundError:
+        return None
+    return result.st_mtime_ns, result.st_size
 
 
 class git:
@@ -29,7 +92,10 @@ class git:
     @property
     def is_repo(self) -> bool:
         return (
-            run(["git", "-C", self.path, "rev-parse"], stderr=DEVNULL).returncode == 0
+            profiler.run(
+                ["git", "-C", self.path, "rev-parse"], stderr=DEVNULL
+            ).returncode
+            == 0
         )
 
     @property
@@ -58,15 +124,12 @@ class git:
         git repository and then stored in `self._remotes`.
         """
         if not self._remotes:
-            result = run(
+            result = profiler.run(
                 ["git", "-C", self.path, "remote", "-v"],
                 encoding="utf-8",
                 capture_output=True,
             )
-            self._remotes = defaultdict(dict)
-            for line in result.stdout.splitlines():
-                values = line.split()
-                self._remotes[values[0]][values[2][1:-1]] = values[1]
+            self._remotes = parse_remotes(result.stdout)
         return self._remotes
 
     @remotes.setter
@@ -79,31 +142,23 @@ class git:
 
     @property
     def branches(self):
-        result = run(
+        result = profiler.run(
             [
                 "git",
                 "-C",
                 self.path,
                 "branch",
                 "--format",
-                "%(refname:short) %(upstream)",
+                BRANCH_FORMAT,
             ],
             encoding="utf-8",
             capture_output=True,
         )
-
-        def gen():
-            for line in result.stdout.splitlines():
-                branch_remote = line.split()
-                branch = branch_remote[0]
-                remote = branch_remote[1] if len(branch_remote) > 1 else None
-                yield branch, remote
-
-        return dict(gen())
+        return parse_branches(result.stdout)
 
     @property
     def stashes(self):
-        result = run(
+        result = profiler.run(
             ["git", "-C", self.path, "stash", "list"],
             encoding="utf-8",
             capture_output=True,
@@ -118,7 +173,7 @@ class git:
     @property
     def dirty(self):
         """See also https://www.kernel.org/pub/software/scm/git/docs/gitglossary.html#def_dirty"""
-        result = run(
+        result = profiler.run(
             ["git", "-C", self.path, "status", "--porcelain"],
             encoding="utf-8",
             capture_output=True,
@@ -128,7 +183,7 @@ class git:
     @property
     def ignorred_dirt(self):
         """Get existing files that are ignored."""
-        result = run(
+        result = profiler.run(
             ["git", "-C", self.path, "status", "--ignored", "--porcelain"],
             encoding="utf-8",
             capture_output=True,
@@ -149,28 +204,187 @@ class git:
     def local_branches(self):
         return [branch for branch, remote in self.branches.items() if remote is None]
 
-    def behind(self, branch):
+    def behind(self, branch, remote=None):
         """Tell, how many commits a repository is beind the remote."""
-        remote = self.branches[branch]
-        result = run(
+        remote = remote or self.branches[branch]
+        result = profiler.run(
             ["git", "-C", self.path, "rev-list", "--count", f"{branch}..{remote}"],
             encoding="utf-8",
             capture_output=True,
         )
-        return int(result.stdout) if len(result.stdout) else 0
+        return parse_count(result.stdout)
 
-    def ahead(self, branch):
+    def ahead(self, branch, remote=None):
         """Tell, how many commits a repository is ahead of the remote."""
-        remote = self.branches[branch]
-        result = run(
+        remote = remote or self.branches[branch]
+        result = profiler.run(
             ["git", "-C", self.path, "rev-list", "--count", f"{remote}..{branch}"],
             encoding="utf-8",
             capture_output=True,
         )
-        return int(result.stdout) if len(result.stdout) else 0
+        return parse_count(result.stdout)
+
+    @property
+    def fingerprint(self):
+        """A cheap fingerprint of the repository state, taken without running git.
+
+        It consists of the modification times and sizes of the files in the git
+        directory that change when commits are made, the index or the configuration
+        is changed, and of all loose refs and the packed refs. Changes in the work
+        tree that did not touch the index are only detected if they changed the top
+        level of the work tree, so the fingerprint only stands for the ref derived
+        part of the status, see `worktree_status`.
+
+        Returns None if the git directory is not a plain `.git` directory, e.g. for
+        linked work trees.
+        """
+        git_dir = self.path / ".git"
+        if not git_dir.is_dir():
+            return None
+        # the loose refs, remote tracking refs and branches with a "/" in their name
+        # are in subdirectories
+        refs = sorted(
+            Path(dirpath, name)
+            for dirpath, dirnames, filenames in walk(git_dir / "refs")
+            for name in [*dirnames, *filenames]
+        )
+        return tuple(
+            stat_fingerprint(path)
+            for path in [
+                self.path,
+                git_dir / "HEAD",
+                git_dir / "index",
+                git_dir / "config",
+                git_dir / "packed-refs",
+                git_dir / "FETCH_HEAD",
+                git_dir / "logs" / "HEAD",
+            ]
+        ) + tuple(
+            (str(path.relative_to(git_dir)), stat_fingerprint(path)) for path in refs
+        )
+
+    @property
+    def objects_fingerprint(self):
+        """A fingerprint of the object store, taken without running git.
+
+        It consists of the modification times and sizes of the object directory, the
+        pack directory and the directories of the loose objects. Returns None if the
+        git directory is not a plain `.git` directory.
+        """
+        objects_dir = self.path / ".git" / "objects"
+        if not objects_dir.is_dir():
+            return None
+        loose_dirs = sorted(
+            entry.name
+            for entry in scandir(objects_dir)
+            if len(entry.name) == 2 and entry.is_dir()
+        )
+        return tuple(
+            (path.name, stat_fingerprint(path))
+            for path in [
+                objects_dir,
+                objects_dir / "pack",
+                *(objects_dir / name for name in loose_dirs),
+            ]
+        )
+
+    @property
+    def count_objects(self) -> dict:
+        """The statistics of the object store as reported by `git count-objects -v`,
+        the sizes are in KiB."""
+        result = profiler.run(
+            ["git", "-C", self.path, "count-objects", "-v"],
+            encoding="utf-8",
+            capture_output=True,
+        )
+        statistics = {}
+        for line in result.stdout.splitlines():
+            key, _, value = line.partition(":")
+            statistics[key.strip()] = parse_count(value.strip())
+        return statistics
+
+    def status(self) -> dict:
+        """Collect the status of the repository in a plain dictionary.
+
+        ```
+        {
+            "repo": "space/simpsons",
+            "is_repo": True,
+            "dirty": False,
+            "ignorred_dirt": True,
+            "stashes": 1,
+            "remotes": True,
+            "branches": {
+                "main": {
+                    "upstream": "refs/remotes/origin/main", "behind": 0, "ahead": 2
+                },
+                "feature": {"upstream": None, "behind": None, "ahead": None},
+            },
+        }
+        ```
+
+        If the path is not a repository, only "repo" and "is_repo" are set.
+        """
+        if not self.is_repo:
+            return {"repo": str(self), "is_repo": False}
+        branches = {}
+        for branch, remote in self.branches.items():
+            branches[branch] = {
+                "upstream": remote,
+                "behind": self.behind(branch, remote) if remote else None,
+                "ahead": self.ahead(branch, remote) if remote else None,
+            }
+        return {
+            "repo": str(self),
+            "is_repo": True,
+            **self.worktree_status(),
+            "stashes": len(self.stashes),
+            "remotes": bool(self.remotes),
+            "branches": branches,
+        }
+
+    def worktree_status(self) -> dict:
+        """The part of the status that depends on the work tree.
+
+        It is not covered by the `fingerprint`, so it has to be probed again, even if
+        the fingerprint did not change.
+        """
+        return {"dirty": bool(self.dirty), "ignorred_dirt": bool(self.ignorred_dirt)}
+
+    def get_config(self, key):
+        """Get a configuration value as seen by the repository or None if unset."""
+        result = profiler.run(
+            ["git", "-C", self.path, "config", "--get", key],
+            encoding="utf-8",
+            capture_output=True,
+        )
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def set_config(self, key, value):
+        """Set a configuration value in the repository configuration."""
+        profiler.run(
+            ["git", "-C", self.path, "config", "--local", key, value],
+            encoding="utf-8",
+            capture_output=True,
+        )
+
+    def maintenance(self, tasks):
+        """Run the given `git maintenance` tasks, e.g. "commit-graph"."""
+        return profiler.run(
+            [
+                "git",
+                "-C",
+                self.path,
+                "maintenance",
+                "run",
+                *(f"--task={task}" for task in tasks),
+            ],
+            encoding="utf-8",
+            capture_output=True,
+        )
 
     def fetch(self):
-        run(
+        return profiler.run(
             ["git", "-C", self.path, "fetch", "--all"],
             encoding="utf-8",
             capture_output=True,
@@ -180,14 +394,9 @@ class git:
         """Clone a repository."""
         if not remotes:
             remotes = self.remotes
-        if remotes.keys():
-            if ORIGIN not in remotes.keys():
-                remote_keys = list(remotes.keys())
-                if len(remote_keys) == 1:
-                    origin = remotes[remote_keys[0]]["fetch"]
-            else:
-                origin = remotes[ORIGIN]["fetch"]
-            res = run(
+        origin = origin_url(remotes)
+        if origin is not None:
+            res = profiler.run(
                 ["git", "-C", self.path, "clone", origin, "."],
                 encoding="utf-8",
                 capture_output=True,
@@ -196,17 +405,165 @@ class git:
 
     def setup(self):
         """Set the remotes for from the repo object to the repo."""
-
-        def set_remote(*args):
-            run(
+        for args in remote_add_args(self.remotes):
+            profiler.run(
                 ["git", "-C", self.path, "remote", "add", *args],
                 encoding="utf-8",
                 capture_output=True,
             )
 
-        for remote, remote_dict in self.remotes.items():
-            if remote_dict["push"] == remote_dict["fetch"]:
-                set_remote(remote, remote_dict["push"])
-            else:
-                for mirror, url in remote_dict.items():
-                    set_remote("--mirror", mirror, remote, url)
+    @property
+    def refs(self):
+        """A dictionary of all refs of the repository with their object names."""
+        result = profiler.run(
+            [
+                "git",
+                "-C",
+                self.path,
+                "for-each-ref",
+                "--format",
+                "%(objectname) %(refname)",
+            ],
+            encoding="utf-8",
+            capture_output=True,
+        )
+        return dict(reversed(line.split(" ", 1)) for line in result.stdout.splitlines())
+
+    @property
+    def head(self):
+        """The ref HEAD points to, or the object name if HEAD is detached."""
+        result = profiler.run(
+            ["git", "-C", self.path, "symbolic-ref", "--quiet", "HEAD"],
+            encoding="utf-8",
+            capture_output=True,
+        )
+        if result.returncode == 0:
+            return result.stdout.strip()
+        result = profiler.run(
+            ["git", "-C", self.path, "rev-parse", "--verify", "--quiet", "HEAD"],
+            encoding="utf-8",
+            capture_output=True,
+        )
+        return result.stdout.strip() or None
+
+    def create_bundle(self, bundle_file, prerequisites=()):
+        """Create a bundle of all refs, that excludes the history of the given
+        prerequisite object names."""
+        return profiler.run(
+            [
+                "git",
+                "-C",
+                self.path,
+                "bundle",
+                "create",
+                bundle_file,
+                "--all",
+                *(f"^{prerequisite}" for prerequisite in prerequisites),
+            ],
+            encoding="utf-8",
+            capture_output=True,
+        )
+
+    def restore_bundles(self, bundle_files, head):
+        """Initialize the repository from bundles, that are fetched in the given
+        order, and check out head."""
+        profiler.run(
+            ["git", "init", "--quiet", self.path],
+            encoding="utf-8",
+            capture_output=True,
+        )
+        for bundle_file in bundle_files:
+            result = profiler.run(
+                [
+                    "git",
+                    "-C",
+                    self.path,
+                    "fetch",
+                    "--quiet",
+                    "--update-head-ok",
+                    bundle_file,
+                    "+refs/*:refs/*",
+                ],
+                encoding="utf-8",
+                capture_output=True,
+            )
+            if result.returncode:
+                return result
+        if head and head.startswith("refs/"):
+            profiler.run(
+                ["git", "-C", self.path, "symbolic-ref", "HEAD", head],
+                encoding="utf-8",
+                capture_output=True,
+            )
+            checkout = ["checkout", "--force", "--quiet"]
+        else:
+            checkout = ["checkout", "--force", "--quiet", "--detach", head or "HEAD"]
+        return profiler.run(
+            ["git", "-C", self.path, *checkout],
+            encoding="utf-8",
+            capture_output=True,
+        )
+
+    def set_upstream(self, branch, upstream):
+        """Set the upstream of a branch, e.g. to "refs/remotes/origin/main"."""
+        return profiler.run(
+            ["git", "-C", self.path, "branch", "--set-upstream-to", upstream, branch],
+            encoding="utf-8",
+            capture_output=True,
+        )
+
+    def fast_forward(self, branch, upstream):
+        """Fast-forward a branch to its upstream.
+
+        The checked out branch is merged with `--ff-only`, other branches are updated
+        without checking them out.
+        """
+        if self.head == f"refs/heads/{branch}":
+            command = ["merge", "--ff-only", "--quiet", upstream]
+        else:
+            command = ["fetch", "--quiet", ".", f"{upstream}:refs/heads/{branch}"]
+        return profiler.run(
+            ["git", "-C", self.path, *command],
+            encoding="utf-8",
+            capture_output=True,
+        )
+
+    @property
+    def unpushed(self):
+        """A dictionary of the local refs with the number of their commits, that are
+        not on any remote.
+
+        The refs are the branches, the tags and a detached HEAD, named as by
+        `git log --source`, e.g. `main`, `v1.0` or `HEAD`.
+        """
+        result = profiler.run(
+            [
+                "git",
+                "-C",
+                self.path,
+                "log",
+                *UNPUSHED_REFS,
+                "--format=%S",
+            ],
+            encoding="utf-8",
+            capture_output=True,
+        )
+        return dict(Counter(result.stdout.split()))
+
+    @property
+    def unpushed_size(self):
+        """The disk usage in bytes of the objects, that are not on any remote."""
+        result = profiler.run(
+            [
+                "git",
+                "-C",
+                self.path,
+                "rev-list",
+                "--objects",
+                "--disk-usage",
+                *UNPUSHED_REFS,
+            ],
+            encoding="utf-8",
+            capture_output=True,
+        )
+        return parse_count(result.stdout.strip())
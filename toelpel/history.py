@@ -0,0 +1,172 @@
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+from threading import Lock
+
+from .git import git
+from .parallel import DEFAULT_JOBS, for_each_repo
+
+HISTORY_SUFFIX = ".history.jsonl"
+
+
+def history_path(index: Path) -> Path:
+    """The history of an index is stored next to it, e.g. `workspaces.history.jsonl`."""
+    return Path(index).with_suffix(HISTORY_SUFFIX)
+
+
+def status_flags(status: dict) -> dict:
+    """Reduce a status as returned by `git.status()` to the states it is counted in."""
+    if not status["is_repo"]:
+        return {"dirty": False, "ahead": False, "behind": False, "not_a_repo": True}
+    branches = status["branches"].values()
+    return {
+        "dirty": status["dirty"],
+        "ahead": any(branch["ahead"] for branch in branches),
+        "behind": any(branch["behind"] for branch in branches),
+        "not_a_repo": False,
+    }
+
+
+def _plain(fingerprint):
+    """The fingerprint as it is read back from JSON, i.e. with lists for tuples."""
+    return json.loads(json.dumps(fingerprint))
+
+
+class History:
+    """An append-only log of the status of the repositories of a colony.
+
+    Each line of the log is a JSON object. A status is only written when it differs
+    from the last recorded status of the repository. If only the fingerprint of a
+    repository changed, the entry has no status. A check, i.e. a probe of all
+    repositories below a directory, is marked with an entry with the directory
+    relative to the base of the colony as scope:
+    ```
+    {"time": "...", "repo": "a", "fingerprint": [...], "status": {...}}
+    {"time": "...", "repo": "a", "fingerprint": [...]}
+    {"time": "...", "check": true, "scope": "."}
+    ```
+    With the recorded fingerprints, the branches of repositories that did not change
+    are not probed with git again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.latest = {}
+        self.checks = []
+        self._lock = Lock()
+        if self.path.exists():
+            with open(self.path) as history_file:
+                for line in history_file:
+                    if line.strip():
+                        self._apply(json.loads(line))
+
+    def _apply(self, entry: dict):
+        if entry.get("check"):
+            self.checks.append(
+                (datetime.fromisoformat(entry["time"]), entry.get("scope", "."))
+            )
+            return
+        latest = self.latest.setdefault(entry["repo"], {})
+        latest["fingerprint"] = entry.get("fingerprint")
+        if "status" in entry:
+            latest["status"] = entry["status"]
+            latest["changed"] = datetime.fromisoformat(entry["time"])
+
+    def _append(self, entry: dict):
+        with self._lock:
+            with open(self.path, "a") as history_file:
+                history_file.write(json.dumps(entry) + "\n")
+            self._apply(entry)
+
+    def last_check(self, repo: str) -> datetime | None:
+        """The time of the last check, that covered the repository."""
+        for time, scope in reversed(self.checks):
+            if scope == "." or Path(repo).is_relative_to(scope):
+                return time
+        return None
+
+    def record(self, repo: str, status: dict, fingerprint=None) -> bool:
+        """Record the status of a repository, if it or its fingerprint changed.
+
+        Returns True, if the status changed.
+        """
+        latest = self.latest.get(repo, {})
+        fingerprint = _plain(fingerprint)
+        changed = latest.get("status") != status
+        if not changed and latest.get("fingerprint") == fingerprint:
+            return False
+        entry = {
+            "time": datetime.now(UTC).isoformat(),
+            "repo": repo,
+            "fingerprint": fingerprint,
+        }
+        if changed:
+            entry["status"] = status
+        self._append(entry)
+        return changed
+
+    def check(self, scope: Path = Path(".")):
+        """Mark that all repositories below the scope, a path relative to the base
+        of the colony, were probed."""
+        self._append(
+            {"time": datetime.now(UTC).isoformat(), "check": True, "scope": str(scope)}
+        )
+
+    def probe(self, repo: git) -> dict:
+        """Get the status of a repository and record it.
+
+        If the fingerprint of the repository is the recorded one, the branches and
+        stashes are taken from the recorded status and only the work tree is probed.
+        """
+        fingerprint = repo.fingerprint
+        latest = self.latest.get(str(repo), {})
+        if (
+            fingerprint is not None
+            and latest.get("status", {}).get("is_repo")
+            and latest["fingerprint"] == _plain(fingerprint)
+        ):
+            status = {**latest["status"], **repo.worktree_status()}
+        else:
+            status = repo.status()
+        self.record(str(repo), status, fingerprint)
+        return status
+
+    def probe_repos(self, repos, jobs: int = DEFAULT_JOBS):
+        """Probe all repositories in parallel, yield `(repo, status)` as they finish."""
+        yield from for_each_repo(self.probe, repos, jobs)
+
+    def changed_since(self, repo: str, since: datetime | None) -> bool:
+        """Tell, if the status of the repository changed after the given time.
+
+        Without a time, every recorded repository counts as changed.
+        """
+        changed = self.latest.get(repo, {}).get("changed")
+        return changed is not None and (since is None or changed > since)
+
+    def trend(self, since: datetime | None = None) -> list:
+        """Replay the log and count the repositories per state after each change.
+
+        Returns a list of `{"time": ..., "dirty": n, "ahead": n, ...}` for the changes
+        after `since`.
+        """
+        flags = {}
+        counts = {"dirty": 0, "ahead": 0, "behind": 0, "not_a_repo": 0}
+        series = []
+        if not self.path.exists():
+            return series
+        with open(self.path) as history_file:
+            for line in history_file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if "status" not in entry:
+                    continue
+                new_flags = status_flags(entry["status"])
+                for state, flag in flags.get(entry["repo"], {}).items():
+                    counts[state] -= flag
+                for state, flag in new_flags.items():
+                    counts[state] += flag
+                flags[entry["repo"]] = new_flags
+                if since is None or datetime.fromisoformat(entry["time"]) > since:
+                    series.append({"time": entry["time"], **counts})
+        return series
@@ -0,0 +1,87 @@
+from functools import cache
+from subprocess import run
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from loguru import logger
+
+from .git import git
+from .parallel import for_each_repo
+
+MAINTENANCE_TASKS = ("commit-graph", "loose-objects", "incremental-repack")
+
+
+@cache
+def fsmonitor_supported() -> bool:
+    """Tell, if the installed git has a builtin file system monitor on this platform."""
+    with TemporaryDirectory() as tmp_dir:
+        run(["git", "init", "--quiet", tmp_dir], capture_output=True)
+        result = run(
+            ["git", "-C", tmp_dir, "fsmonitor--daemon", "status"],
+            encoding="utf-8",
+            capture_output=True,
+        )
+    return "not supported" not in result.stderr and result.returncode != 129
+
+
+def probe_time(repo: git, samples: int = 2) -> float:
+    """Measure the time to probe the status of a repository.
+
+    The best of several samples is taken, so that the first probe does not only
+    measure a cold file system cache.
+    """
+    times = []
+    for _ in range(samples):
+        start = perf_counter()
+        repo.status()
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def maintain(
+    repo: git,
+    tasks=MAINTENANCE_TASKS,
+    untracked_cache: bool = True,
+    fsmonitor: bool = True,
+) -> dict:
+    """Run the maintenance tasks on a repository and enable the untracked cache and
+    the file system monitor.
+
+    Configuration values that are already set, e.g. `core.fsmonitor=false` in the
+    global configuration, are respected and not changed.
+    """
+    result = {"repo": str(repo), "before": probe_time(repo), "configured": []}
+    maintenance = repo.maintenance(tasks)
+    if maintenance.returncode:
+        logger.warning(f"Maintenance of {repo} failed: {maintenance.stderr.strip()}")
+    result["returncode"] = maintenance.returncode
+
+    if untracked_cache and repo.get_config("core.untrackedCache") is None:
+        repo.set_config("core.untrackedCache", "true")
+        result["configured"].append("core.untrackedCache")
+    if (
+        fsmonitor
+        and fsmonitor_supported()
+        and repo.get_config("core.fsmonitor") is None
+    ):
+        repo.set_config("core.fsmonitor", "true")
+        result["configured"].append("core.fsmonitor")
+
+    result["after"] = probe_time(repo)
+    return result
+
+
+def maintain_repos(repos, jobs: int = 1, **kwargs):
+    """Run `maintain` on all cloned repositories with `jobs` in parallel.
+
+    Yields the results in the order in which the repositories are finished.
+    """
+
+    def maintain_cloned(repo):
+        if not repo.path.is_dir() or not repo.is_repo:
+            return None
+        return maintain(repo, **kwargs)
+
+    for _, result in for_each_repo(maintain_cloned, repos, jobs):
+        if result is not None:
+            yield result
@@ -0,0 +1,121 @@
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in sorted(labels.items())
+    )
+    return "{" + pairs + "}"
+
+
+def _value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A metric family with samples per label set."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.samples = defaultdict(float)
+        self._lock = Lock()
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.samples[tuple(sorted(labels.items()))] = value
+
+    def inc(self, value: float = 1, **labels):
+        with self._lock:
+            self.samples[tuple(sorted(labels.items()))] += value
+
+    def clear(self):
+        with self._lock:
+            self.samples.clear()
+
+    def expose(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        with self._lock:
+            samples = list(self.samples.items())
+        for labels, value in samples:
+            yield f"{self.name}{_labels(dict(labels))} {_value(value)}"
+
+
+class Counter(Metric):
+    type = "counter"
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        with self._lock:
+            position = bisect_left(self.buckets, value)
+            if position < len(self.buckets):
+                self.counts[position] += 1
+            self.sum += value
+            self.count += 1
+
+    def expose(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        with self._lock:
+            cumulative = 0
+            for bucket, count in zip(self.buckets, self.counts, strict=True):
+                cumulative += count
+                yield f'{self.name}_bucket{{le="{_value(bucket)}"}} {cumulative}'
+            yield f'{self.name}_bucket{{le="+Inf"}} {self.count}'
+            yield f"{self.name}_sum {_value(self.sum)}"
+            yield f"{self.name}_count {self.count}"
+
+
+class Registry:
+    """A collection of metrics that is exposed in the Prometheus text format.
+
+    cf. https://prometheus.io/docs/instrumenting/exposition_formats/
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self.add(Counter(name, help))
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self.add(Gauge(name, help))
+
+    def histogram(self, name: str, help: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.add(Histogram(name, help, buckets))
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
@@ -1,48 +1,75 @@
 from rich.console import Console
 from rich.table import Table
 
+from .parallel import map_repos
+from .profile import profiler
 
-def print_table(git_repos):
 
+def print_table(git_repos, jobs: int = 1):
+    """Probe the status of the repositories, with `jobs` in parallel, and print it."""
+    with profiler.phase("probe"):
+        statuses = map_repos(lambda repo: repo.status(), git_repos, jobs)
+    print_status_table(statuses)
+
+
+def print_status_table(statuses):
+    """Print a table of repository statuses as returned by `git.status()`.
+
+    If the statuses have a "workspace" key, a column with the workspace is added.
+    """
+    with profiler.phase("render"):
+        _print_status_table(list(statuses))
+
+
+def _print_status_table(statuses):
     console = Console()
     table = Table(show_header=True, header_style="bold")
 
+    with_workspace = any("workspace" in repo for repo in statuses)
+    if with_workspace:
+        table.add_column("Workspace")
     table.add_column("Status")
     table.add_column("Repository", ratio=2)
     table.add_column("Branches", ratio=1)
 
-    for repo in git_repos:
+    for repo in statuses:
+        workspace = [repo.get("workspace", "")] if with_workspace else []
         status = []
         branches = []
         status_count = 0
-        if not repo.is_repo:
-            table.add_row("[bold]not a repo[/bold]", f"[bold]{repo}[/bold]", "")
+        if not repo["is_repo"]:
+            table.add_row(
+                *workspace,
+                "[bold]not a repo[/bold]",
+                f"[bold]{repo['repo']}[/bold]",
+                "",
+            )
             continue
-        if repo.dirty:
+        if repo["dirty"]:
             status_count += 1
             status.append("[bold blue]?[/bold blue]")
         else:
             status.append("-")
-        if repo.ignorred_dirt:
+        if repo["ignorred_dirt"]:
             status_count += 1
             status.append("[bold bright_black]?[/bold bright_black]")
         else:
             status.append("-")
-        if repo.stashes:
+        if repo["stashes"]:
             status_count += 1
             status.append("[bold yellow]*[/bold yellow]")
         else:
             status.append("-")
-        if not repo.remotes:
+        if not repo["remotes"]:
             status_count += 1
             branches.append("[bold red]no remote[/bold red]")
-        elif repo.local_branches:
+        elif any(not branch["upstream"] for branch in repo["branches"].values()):
             status_count += 1
             branches.append("[red]local branches[/red]")
-        for branch, remote in repo.branches.items():
-            if remote:
-                behind = repo.behind(branch)
-                ahead = repo.ahead(branch)
+        for branch, branch_status in repo["branches"].items():
+            if branch_status["upstream"]:
+                behind = branch_status["behind"]
+                ahead = branch_status["ahead"]
                 status_count += 1 if (behind or ahead) else 0
                 div = ""
                 if behind or ahead:
@@ -54,6 +81,157 @@ def print_table(git_repos):
                 status_count += 1
                 branches.append(f"[bold red]\\[{branch}: ×][/bold red]")
 
-        repo_line = f"[bold]{repo}[/bold]" if status_count else f"{repo}"
-        table.add_row(" ".join(status), repo_line, " ".join(branches))
+        repo_line = f"[bold]{repo['repo']}[/bold]" if status_count else repo["repo"]
+        table.add_row(*workspace, " ".join(status), repo_line, " ".join(branches))
+    console.print(table)
+
+
+def print_maintenance_table(results):
+    """Print the status probe timings before and after maintenance per repository."""
+    console = Console()
+    table = Table(show_header=True, header_style="bold")
+
+    table.add_column("Repository", ratio=2)
+    table.add_column("Before", justify="right")
+    table.add_column("After", justify="right")
+    table.add_column("Speedup", justify="right")
+    table.add_column("Configured", ratio=1)
+
+    for result in sorted(results, key=lambda result: result["repo"]):
+        speedup = result["before"] / result["after"] if result["after"] else 0
+        fg = "green" if speedup >= 1 else "red"
+        repo_line = (
+            f"[bold red]{result['repo']}[/bold red]"
+            if result["returncode"]
+            else result["repo"]
+        )
+        table.add_row(
+            repo_line,
+            f"{result['before'] * 1000:.1f}ms",
+            f"{result['after'] * 1000:.1f}ms",
+            f"[{fg}]{speedup:.2f}×[/{fg}]",
+            " ".join(result["configured"]),
+        )
+    console.print(table)
+
+
+def print_reconcile_table(result):
+    """Print the missing, broken and extra repositories of a reconciliation."""
+    console = Console()
+    table = Table(show_header=True, header_style="bold")
+
+    table.add_column("Status")
+    table.add_column("Repository", ratio=2)
+
+    labels = {
+        "missing": "[bold red]missing[/bold red]",
+        "broken": "[bold yellow]broken[/bold yellow]",
+        "extra": "[bold blue]not indexed[/bold blue]",
+    }
+    for name, label in labels.items():
+        for relpath in result[name]:
+            table.add_row(label, relpath)
+    console.print(table)
+
+
+def print_update_table(results):
+    """Print the updated, diverged and skipped repositories of an update."""
+    console = Console()
+    table = Table(show_header=True, header_style="bold")
+
+    table.add_column("Status")
+    table.add_column("Repository", ratio=2)
+    table.add_column("Branches", ratio=1)
+
+    for result in sorted(results, key=lambda result: result["repo"]):
+        if result["skipped"] in ["dirty", "not a repo"]:
+            table.add_row(
+                f"[bold yellow]{result['skipped']}[/bold yellow]", result["repo"], ""
+            )
+            continue
+        branches = [
+            f"[green]\\[{branch}: +{count}][/green]"
+            for branch, count in result["updated"].items()
+        ]
+        branches += [
+            f"[bold red]\\[{branch}: diverged][/bold red]"
+            for branch in result["diverged"]
+        ]
+        branches += [
+            f"[bold red]\\[{branch}: failed][/bold red]" for branch in result["failed"]
+        ]
+        if not branches:
+            continue
+        status = (
+            "[bold red]skipped[/bold red]"
+            if result["diverged"] or result["failed"]
+            else "[green]updated[/green]"
+        )
+        table.add_row(status, result["repo"], " ".join(branches))
+    console.print(table)
+
+
+def format_size(size: int) -> str:
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if size < 1024:
+            break
+        size /= 1024
+    return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+
+
+def print_audit_table(results):
+    """Print the repositories with unpushed commits, stashes or uncommitted files."""
+    console = Console()
+    table = Table(show_header=True, header_style="bold")
+
+    table.add_column("Repository", ratio=2)
+    table.add_column("Commits", justify="right")
+    table.add_column("Size", justify="right")
+    table.add_column("Stashes", justify="right")
+    table.add_column("Untracked", justify="right")
+    table.add_column("Modified", justify="right")
+    table.add_column("Branches", ratio=1)
+
+    for result in sorted(results, key=lambda result: result["repo"]):
+        branches = [
+            f"[red]\\[{branch}: +{branch_status['commits']}][/red]"
+            if branch_status["upstream"]
+            else f"[bold red]\\[{branch}: +{branch_status['commits']} ×][/bold red]"
+            for branch, branch_status in result["branches"].items()
+        ]
+        table.add_row(
+            f"[bold]{result['repo']}[/bold]",
+            str(result["commits"] or "-"),
+            format_size(result["size"]) if result["commits"] else "-",
+            str(result["stashes"] or "-"),
+            str(result["untracked"] or "-"),
+            str(result["modified"] or "-"),
+            " ".join(branches),
+        )
+    console.print(table)
+
+
+def print_du_table(results):
+    """Print the size of the object store and the work tree per repository."""
+    console = Console()
+    table = Table(show_header=True, header_style="bold")
+
+    table.add_column("Repository", ratio=2)
+    table.add_column("Objects", justify="right")
+    table.add_column("Work tree", justify="right")
+    table.add_column("Total", justify="right")
+    table.add_column("Loose", justify="right")
+    table.add_column("Packs", justify="right")
+    table.add_column("gc", ratio=1)
+
+    for result in results:
+        table.add_row(
+            f"[bold]{result['repo']}[/bold]" if result["gc"] else result["repo"],
+            format_size(result["objects"]),
+            format_size(result["worktree"]),
+            format_size(result["objects"] + result["worktree"]),
+            str(result["loose"]),
+            str(result["packs"]),
+            f"[bold yellow]{', '.join(result['gc'])}[/bold yellow]",
+        )
     console.print(table)
@@ -0,0 +1,212 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from os import cpu_count
+from queue import Queue
+from subprocess import PIPE, STDOUT, CompletedProcess, Popen
+from tempfile import TemporaryFile
+from threading import Event, Lock
+from time import perf_counter
+
+from .git import git
+from .profile import profiler
+
+DEFAULT_JOBS = min(32, (cpu_count() or 1) * 2)
+
+
+def for_each_repo(func, repos, jobs: int = DEFAULT_JOBS):
+    """Call `func` for each repository in a pool of `jobs` threads.
+
+    Yields the tuples `(repo, result)` in the order in which the calls finish. Most
+    of the work is done by git processes, so threads are sufficient to run them
+    concurrently.
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(func, repo): repo for repo in repos}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def map_repos(func, repos, jobs: int = DEFAULT_JOBS) -> list:
+    """Call `func` for each repository in a pool of `jobs` threads and return the
+    results in the order of the repositories."""
+    if jobs <= 1:
+        return [func(repo) for repo in repos]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(func, repos))
+
+
+def repo_filter(dirty: bool = False, behind: bool = False, has_remote: bool = False):
+    """Create a predicate that selects repositories by their status.
+
+    Repositories that are not cloned are never selected. Each criterion that is set
+    has to be fulfilled.
+    """
+
+    def predicate(repo: git) -> bool:
+        if not repo.path.is_dir() or not repo.is_repo:
+            return False
+        if dirty and not repo.dirty:
+            return False
+        if has_remote and not repo.remotes:
+            return False
+        if behind and not any(
+            repo.behind(branch, remote)
+            for branch, remote in repo.branches.items()
+            if remote
+        ):
+            return False
+        return True
+
+    return predicate
+
+
+class CommandRunner:
+    """Run a command in repositories and print its output.
+
+    The output is either buffered and printed as one block per repository when the
+    command finished, or, with `prefix`, printed line by line as it arrives, prefixed
+    with the relative path of the repository.
+    """
+
+    def __init__(self, command: list, echo, prefix: bool = False):
+        self.command = command
+        self.echo = echo
+        self.prefix = prefix
+        self._lock = Lock()
+
+    def __call__(self, repo: git) -> int:
+        """Run the command in the repository and return its exit code.
+
+        If the command can not be started, the error is printed as its output and the
+        exit code is 127 if it was not found, like in a shell, and 126 otherwise.
+        """
+        start = perf_counter()
+        output = []
+        try:
+            process = Popen(
+                self.command,
+                cwd=repo.path,
+                stdout=PIPE,
+                stderr=STDOUT,
+                encoding="utf-8",
+                errors="replace",
+            )
+        except OSError as error:
+            process = None
+            returncode = 127 if isinstance(error, FileNotFoundError) else 126
+            output.append(f"{error}\n")
+            if self.prefix:
+                with self._lock:
+                    self.echo(f"{repo}: {error}")
+        if process is not None:
+            for line in process.stdout:
+                output.append(line)
+                if self.prefix:
+                    with self._lock:
+                        self.echo(f"{repo}: {line}", nl=False)
+            returncode = process.wait()
+        output = "".join(output)
+        if profiler.enabled:
+            profiler.record_process(
+                self.command,
+                start,
+                perf_counter() - start,
+                CompletedProcess(self.command, returncode, output),
+                repo=repo.path,
+                type="exec",
+            )
+        if not self.prefix:
+            with self._lock:
+                self.echo(f"── {repo} (exit {returncode})")
+                if output:
+                    self.echo(output, nl=not output.endswith("\n"))
+        return returncode
+
+
+def grep(
+    repos,
+    pattern: str,
+    args=(),
+    jobs: int = DEFAULT_JOBS,
+    limit: int = 0,
+    on_error=None,
+):
+    """Run `git grep` for a pattern in all repositories concurrently.
+
+    Yields the tuples `(repo, line)` as the matches arrive, where line is the output
+    line of `git grep`, i.e. `<file>:<line number>:<match>`. If `limit` is set, the
+    search is stopped after that many matches and the running processes are killed.
+    If `git grep` fails in a repository, e.g. for an invalid pattern, `on_error` is
+    called with the repository and the error output.
+    """
+    results = Queue()
+    stopped = Event()
+    processes = set()
+    lock = Lock()
+
+    def search(repo: git):
+        if stopped.is_set() or not repo.path.is_dir():
+            return
+        command = ["git", "-C", repo.path, "grep", "-I", "-n", "--no-color", *args]
+        start = perf_counter()
+        # a file instead of a pipe, so that a long error output can not block git
+        error_output = TemporaryFile("w+", encoding="utf-8", errors="replace")
+        process = Popen(
+            [*command, "-e", pattern],
+            stdout=PIPE,
+            stderr=error_output,
+            encoding="utf-8",
+            errors="replace",
+        )
+        with lock:
+            processes.add(process)
+            if stopped.is_set():
+                # the limit was reached while the process was started
+                process.kill()
+        output_size = 0
+        for line in process.stdout:
+            output_size += len(line)
+            results.put((repo, line.rstrip("\n")))
+        returncode = process.wait()
+        with lock:
+            processes.discard(process)
+        with error_output:
+            # exit code 1 means no match, a killed process has a negative one
+            if returncode >= 2 and on_error is not None:
+                error_output.seek(0)
+                on_error(repo, error_output.read().strip())
+        if profiler.enabled:
+            profiler.record_process(
+                command,
+                start,
+                perf_counter() - start,
+                CompletedProcess(command, returncode),
+                output_size=output_size,
+            )
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(search, repo) for repo in repos]
+        for future in futures:
+            future.add_done_callback(lambda _: results.put(None))
+        running = len(futures)
+        count = 0
+        try:
+            while running:
+                result = results.get()
+                if result is None:
+                    running -= 1
+                    continue
+                yield result
+                count += 1
+                if limit and count >= limit:
+                    break
+        finally:
+            stopped.set()
+            for future in futures:
+                future.cancel()
+            with lock:
+                for process in processes:
+                    process.kill()
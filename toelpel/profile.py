@@ -0,0 +1,190 @@
+import json
+import subprocess
+from collections import defaultdict
+from contextlib import contextmanager
+from os import getpid
+from pathlib import Path
+from threading import Lock, get_ident
+from time import perf_counter
+
+from rich.console import Console
+from rich.table import Table
+
+
+class Profiler:
+    """Record the git processes and the phases of a toelpel run.
+
+    The profiler is disabled by default, in which case `run` is a plain
+    `subprocess.run` and `phase` does nothing. Enable it with the `--profile` option
+    of the `cli` group.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.processes = []
+        self.phases = []
+        self._start = perf_counter()
+        self._lock = Lock()
+
+    def enable(self):
+        """Start a new recording, the records of a previous run are discarded."""
+        with self._lock:
+            self.processes = []
+            self.phases = []
+        self.enabled = True
+        self._start = perf_counter()
+
+    def disable(self):
+        self.enabled = False
+
+    def run(self, args, **kwargs):
+        """Run a process like `subprocess.run` and record it if enabled."""
+        if not self.enabled:
+            return subprocess.run(args, **kwargs)
+        start = perf_counter()
+        result = subprocess.run(args, **kwargs)
+        self.record_process(args, start, perf_counter() - start, result)
+        return result
+
+    def record_process(
+        self, args, start, duration, result, repo=None, type=None, output_size=None
+    ):
+        """Record a finished process.
+
+        The repository and the type of the command are taken from the arguments of a
+        `git -C <repo> <command>` call, if they are not given. The output size is
+        taken from the captured output, if it is not given.
+        """
+        args = [str(arg) for arg in args]
+        command = args[1:]
+        if repo is None and command[:1] == ["-C"]:
+            repo = command[1]
+            command = command[2:]
+        if output_size is None:
+            output_size = len(result.stdout or "")
+        with self._lock:
+            self.processes.append(
+                {
+                    "command": args,
+                    "type": type or (command[0] if command else args[0]),
+                    "repo": str(repo) if repo else None,
+                    "start": start - self._start,
+                    "duration": duration,
+                    "returncode": result.returncode,
+                    "output_size": output_size,
+                    "tid": get_ident(),
+                }
+            )
+
+    @contextmanager
+    def phase(self, name: str):
+        """Measure the wall time of a phase, e.g. loading the index."""
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases.append(
+                    {
+                        "name": name,
+                        "start": start - self._start,
+                        "duration": perf_counter() - start,
+                        "tid": get_ident(),
+                    }
+                )
+
+    def print_summary(self, top: int = 10):
+        console = Console(stderr=True)
+
+        phase_times = defaultdict(float)
+        for phase in self.phases:
+            phase_times[phase["name"]] += phase["duration"]
+        phase_times["git processes"] = sum(p["duration"] for p in self.processes)
+        phase_times["total"] = perf_counter() - self._start
+        table = Table(title="Time per phase", show_header=True, header_style="bold")
+        table.add_column("Phase", ratio=2)
+        table.add_column("Time", justify="right")
+        for name, duration in phase_times.items():
+            table.add_row(name, f"{duration:.3f}s")
+        console.print(table)
+
+        command_counts = defaultdict(lambda: [0, 0.0])
+        for process in self.processes:
+            command_counts[process["type"]][0] += 1
+            command_counts[process["type"]][1] += process["duration"]
+        table = Table(title="Git processes", show_header=True, header_style="bold")
+        table.add_column("Command", ratio=2)
+        table.add_column("Count", justify="right")
+        table.add_column("Time", justify="right")
+        for command, (count, duration) in sorted(
+            command_counts.items(), key=lambda item: -item[1][1]
+        ):
+            table.add_row(command, str(count), f"{duration:.3f}s")
+        console.print(table)
+
+        repo_times = defaultdict(lambda: [0, 0.0])
+        for process in self.processes:
+            if process["repo"]:
+                repo_times[process["repo"]][0] += 1
+                repo_times[process["repo"]][1] += process["duration"]
+        table = Table(
+            title=f"Top {top} slowest repositories",
+            show_header=True,
+            header_style="bold",
+        )
+        table.add_column("Repository", ratio=2)
+        table.add_column("Processes", justify="right")
+        table.add_column("Time", justify="right")
+        for repo, (count, duration) in sorted(
+            repo_times.items(), key=lambda item: -item[1][1]
+        )[:top]:
+            table.add_row(repo, str(count), f"{duration:.3f}s")
+        console.print(table)
+
+    def export(self, path: Path, format: str = "json"):
+        """Write the recorded data to a file.
+
+        format is "json" for the raw records or "chrome" for the Trace Event Format,
+        that can be loaded in chrome://tracing or https://ui.perfetto.dev.
+        """
+        if format == "chrome":
+            pid = getpid()
+            events = [
+                {
+                    "name": phase["name"],
+                    "cat": "phase",
+                    "ph": "X",
+                    "ts": phase["start"] * 1e6,
+                    "dur": phase["duration"] * 1e6,
+                    "pid": pid,
+                    "tid": phase["tid"],
+                }
+                for phase in self.phases
+            ] + [
+                {
+                    "name": f"git {process['type']}",
+                    "cat": "git",
+                    "ph": "X",
+                    "ts": process["start"] * 1e6,
+                    "dur": process["duration"] * 1e6,
+                    "pid": pid,
+                    "tid": process["tid"],
+                    "args": {
+                        "command": " ".join(process["command"]),
+                        "repo": process["repo"],
+                        "returncode": process["returncode"],
+                        "output_size": process["output_size"],
+                    },
+                }
+                for process in self.processes
+            ]
+            data = {"traceEvents": events}
+        else:
+            data = {"phases": self.phases, "processes": self.processes}
+        Path(path).write_text(json.dumps(data, indent=2))
+
+
+profiler = Profiler()
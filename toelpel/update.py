@@ -0,0 +1,56 @@
+from .git import git
+from .parallel import DEFAULT_JOBS, for_each_repo
+
+
+def update_repo(repo: git, all_branches: bool = False) -> dict:
+    """Fast-forward the checked out branch, and with `all_branches` all other
+    tracking branches, of a clean repository that is strictly behind its upstream.
+
+    Returns a dict with the updated branches and their number of new commits, the
+    diverged branches, the branches that failed to update and the reason, why the
+    repository was skipped, if it was.
+    """
+    result = {
+        "repo": str(repo),
+        "updated": {},
+        "diverged": [],
+        "failed": [],
+        "skipped": None,
+    }
+    if not repo.path.is_dir() or not repo.is_repo:
+        result["skipped"] = "not a repo"
+        return result
+    if repo.dirty:
+        result["skipped"] = "dirty"
+        return result
+    head = repo.head
+    branches = {
+        branch: upstream
+        for branch, upstream in repo.branches.items()
+        if upstream and (all_branches or f"refs/heads/{branch}" == head)
+    }
+    if not branches:
+        result["skipped"] = "no upstream"
+        return result
+
+    for branch, upstream in branches.items():
+        behind = repo.behind(branch, upstream)
+        if not behind:
+            continue
+        if repo.ahead(branch, upstream):
+            result["diverged"].append(branch)
+            continue
+        if repo.fast_forward(branch, upstream).returncode:
+            result["failed"].append(branch)
+        else:
+            result["updated"][branch] = behind
+    return result
+
+
+def update_repos(repos, all_branches: bool = False, jobs: int = DEFAULT_JOBS):
+    """Run `update_repo` on all repositories in parallel, yield the results as they
+    finish."""
+    for _, result in for_each_repo(
+        lambda repo: update_repo(repo, all_branches), repos, jobs
+    ):
+        yield result